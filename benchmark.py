@@ -0,0 +1,241 @@
+"""
+ifc_to_gltf 转换性能基准测试
+
+用 ifcopenshell.api 生成规模可配置的合成IFC模型（墙/楼板/柱数量、重复类型数、属性集密度、网格复杂度），
+在独立子进程中运行 ifc_to_gltf，统计吞吐量（构件/秒、MB/秒）、峰值内存和输出大小，并与保存的基线比较
+
+    python benchmark.py                       运行全部场景并与基线比较
+    python benchmark.py --save-baseline       运行并保存为新的基线
+    python benchmark.py --scenarios walls --repeat 5 --options '{"quantize": true}'
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api
+
+import ve_bin_gltf
+
+# 测试场景：每层的墙/柱/楼板数量、柱类型数量、每个构件的属性数量、柱截面多边形的边数
+SCENARIOS = {
+    "small": dict(storeys=2, walls=20, columns=20, slabs=1, column_types=2, properties=4, profile_sides=8),
+    "walls": dict(storeys=10, walls=200, columns=0, slabs=1, column_types=1, properties=4, profile_sides=8),
+    "typed_columns": dict(storeys=10, walls=0, columns=200, slabs=1, column_types=5, properties=4, profile_sides=8),
+    "dense_psets": dict(storeys=4, walls=100, columns=100, slabs=1, column_types=5, properties=60, profile_sides=8),
+    "complex_mesh": dict(storeys=2, walls=20, columns=50, slabs=1, column_types=50, properties=4, profile_sides=128),
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+def generate_model(ifc_file_path, storeys, walls, columns, slabs, column_types, properties, profile_sides):
+    """
+    生成合成IFC4模型：每层 walls 面墙、columns 根柱、slabs 块楼板
+    柱按顺序分配到 column_types 个柱类型上（类型带几何，构件通过映射表示共享）；
+    每个构件带一个含 properties 个属性的属性集；柱截面为 profile_sides 边形，控制网格复杂度
+    """
+    run = ifcopenshell.api.run
+    f = run("project.create_file", version="IFC4")
+    project = run("root.create_entity", f, ifc_class="IfcProject", name="Benchmark")
+    run("unit.assign_unit", f, length={"is_metric": True, "raw": "METERS"})
+    model = run("context.add_context", f, context_type="Model")
+    body = run("context.add_context", f, context_type="Model", context_identifier="Body",
+               target_view="MODEL_VIEW", parent=model)
+    site = run("root.create_entity", f, ifc_class="IfcSite", name="Site")
+    building = run("root.create_entity", f, ifc_class="IfcBuilding", name="Building")
+    run("aggregate.assign_object", f, relating_object=project, products=[site])
+    run("aggregate.assign_object", f, relating_object=site, products=[building])
+    material = run("material.add_material", f, name="Concrete")
+
+    # 柱类型：正多边形截面拉伸
+    angles = np.linspace(0, 2 * np.pi, profile_sides, endpoint=False)
+    points = [f.createIfcCartesianPoint((0.2 * np.cos(a), 0.2 * np.sin(a))) for a in angles]
+    profile = f.createIfcArbitraryClosedProfileDef("AREA", None, f.createIfcPolyline(points + points[:1]))
+    types = []
+    for i in range(column_types):
+        column_type = run("root.create_entity", f, ifc_class="IfcColumnType", name=f"ColumnType{i}")
+        representation = run("geometry.add_profile_representation", f, context=body, profile=profile, depth=3.0)
+        run("geometry.assign_representation", f, product=column_type, representation=representation)
+        types.append(column_type)
+
+    def add_properties(product, pset_name, index):
+        pset = run("pset.add_pset", f, product=product, name=pset_name)
+        run("pset.edit_pset", f, pset=pset, properties={
+            f"Property{k}": (f"Value{index}-{k}" if k % 2 else float(index + k)) for k in range(properties)
+        })
+
+    def place(product, storey, x, y, z):
+        matrix = np.eye(4)
+        matrix[:3, 3] = (x, y, z)
+        run("geometry.edit_object_placement", f, product=product, matrix=matrix)
+        run("spatial.assign_container", f, relating_structure=storey, products=[product])
+
+    side = max(1, int(np.ceil(np.sqrt(max(walls, columns, 1)))))
+    index = 0
+    for level in range(storeys):
+        storey = run("root.create_entity", f, ifc_class="IfcBuildingStorey", name=f"Level {level}")
+        run("aggregate.assign_object", f, relating_object=building, products=[storey])
+        elevation = level * 3.0
+
+        for i in range(walls):
+            wall = run("root.create_entity", f, ifc_class="IfcWall", name=f"Wall {level}-{i}")
+            representation = run("geometry.add_wall_representation", f, context=body,
+                                 length=4.0, height=3.0, thickness=0.2)
+            run("geometry.assign_representation", f, product=wall, representation=representation)
+            place(wall, storey, (i % side) * 5.0, (i // side) * 5.0, elevation)
+            run("material.assign_material", f, products=[wall], material=material)
+            add_properties(wall, "Pset_WallCommon", index)
+            index += 1
+
+        for i in range(columns):
+            column = run("root.create_entity", f, ifc_class="IfcColumn", name=f"Column {level}-{i}")
+            run("type.assign_type", f, related_objects=[column], relating_type=types[i % column_types])
+            place(column, storey, (i % side) * 5.0 + 4.5, (i // side) * 5.0 + 2.0, elevation)
+            add_properties(column, "Pset_ColumnCommon", index)
+            index += 1
+
+        for i in range(slabs):
+            slab = run("root.create_entity", f, ifc_class="IfcSlab", name=f"Slab {level}-{i}")
+            extent = side * 5.0
+            representation = run("geometry.add_slab_representation", f, context=body, depth=0.2,
+                                 polyline=[(0, 0), (extent, 0), (extent, extent), (0, extent)])
+            run("geometry.assign_representation", f, product=slab, representation=representation)
+            place(slab, storey, 0.0, 0.0, elevation - 0.2)
+            add_properties(slab, "Pset_SlabCommon", index)
+            index += 1
+
+    f.write(ifc_file_path)
+
+def model_path(work_dir, params):
+    """同样参数的模型只生成一次，文件名包含参数哈希"""
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+    return os.path.join(work_dir, f"model_{digest}.ifc")
+
+def measure(ifc_file_path, gltf_file_path, options, connection):
+    """子进程入口：转换一次并发回用时、峰值内存和输出大小"""
+    sys.stdout = open(os.devnull, "w")
+    start = time.perf_counter()
+    summary = ve_bin_gltf.ifc_to_gltf(ifc_file_path, gltf_file_path, verbose=False, **options)
+    seconds = time.perf_counter() - start
+    connection.send({
+        "seconds": seconds,
+        "products": summary["products"],
+        "peak_memory_bytes": ve_bin_gltf.peak_memory_bytes(),
+        "output_bytes": sum(os.path.getsize(path) for path in ve_bin_gltf.output_files(gltf_file_path))
+    })
+    connection.close()
+
+def run_scenario(name, params, work_dir, repeat=3, options=None):
+    """
+    运行一个场景 repeat 次，每次在新的子进程中转换（峰值内存互不影响），取用时的中位数
+    子进程用 spawn 方式启动：fork 出的子进程峰值内存（ru_maxrss）从父进程当前占用开始计算，
+    会把生成模型占用的内存算进去，同一场景在模型已生成和需要生成时的结果不一致
+    """
+    ifc_file_path = model_path(work_dir, params)
+    if not os.path.exists(ifc_file_path):
+        print(f"正在生成模型: {name}")
+        generate_model(ifc_file_path, **params)
+
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=measure,
+            args=(ifc_file_path, os.path.join(work_dir, f"{name}.glb"), options or {}, sender)
+        )
+        process.start()
+        sender.close()
+        runs.append(receiver.recv())
+        process.join()
+
+    seconds = float(np.median([run["seconds"] for run in runs]))
+    input_mb = os.path.getsize(ifc_file_path) / 1024 ** 2
+    peaks = [run["peak_memory_bytes"] for run in runs if run["peak_memory_bytes"] is not None]
+    return {
+        "params": params,
+        "products": runs[0]["products"],
+        "input_bytes": os.path.getsize(ifc_file_path),
+        "seconds": round(seconds, 4),
+        "elements_per_second": round(runs[0]["products"] / seconds, 2),
+        "mb_per_second": round(input_mb / seconds, 4),
+        "peak_memory_bytes": max(peaks) if peaks else None,
+        "output_bytes": runs[0]["output_bytes"]
+    }
+
+def compare(results, baseline, tolerance):
+    """与基线比较，吞吐量下降或峰值内存、输出大小增加超过 tolerance（比例）视为退化，返回退化项列表"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            print(f"{name}: 基线中没有该场景")
+            continue
+        if reference["params"] != result["params"]:
+            print(f"{name}: 场景参数与基线不同，跳过比较")
+            continue
+        checks = [
+            ("elements_per_second", result["elements_per_second"] / reference["elements_per_second"], True),
+            ("output_bytes", result["output_bytes"] / reference["output_bytes"], False),
+        ]
+        if result["peak_memory_bytes"] and reference.get("peak_memory_bytes"):
+            checks.append(("peak_memory_bytes", result["peak_memory_bytes"] / reference["peak_memory_bytes"], False))
+        for metric, ratio, higher_is_better in checks:
+            regressed = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+            print(f"{name}.{metric}: {ratio:.3f}x 基线{'  <-- 退化' if regressed else ''}")
+            if regressed:
+                regressions.append(f"{name}.{metric}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ifc_to_gltf 性能基准测试")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), help="要运行的场景，默认全部")
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景的运行次数，取中位数")
+    parser.add_argument("--options", default="{}", help="传给 ifc_to_gltf 的参数（JSON）")
+    parser.add_argument("--work-dir", default="benchmark_output", help="生成的模型和输出文件目录")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的退化比例，默认 0.1（10%%）")
+    args = parser.parse_args(argv)
+
+    options = json.loads(args.options)
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        results[name] = run_scenario(name, SCENARIOS[name], args.work_dir, args.repeat, options)
+        result = results[name]
+        print(f"{name}: {result['products']} 个构件, {result['seconds']:.3f}秒, "
+              f"{result['elements_per_second']:.1f} 构件/秒, {result['mb_per_second']:.2f} MB/秒, "
+              f"峰值内存 {(result['peak_memory_bytes'] or 0) / 1024 ** 2:.1f} MB, 输出 {result['output_bytes']} 字节")
+
+    report = {"options": options, "results": results}
+    with open(os.path.join(args.work_dir, "benchmark.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存为: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("没有基线文件，使用 --save-baseline 保存本次结果作为基线")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("options") != options:
+        print("警告: 本次转换参数与基线不同")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"性能退化: {', '.join(regressions)}")
+        return 1
+    print("未发现性能退化")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
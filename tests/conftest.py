@@ -0,0 +1,49 @@
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+import ifcopenshell.api
+
+# 测试直接导入仓库根目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+run = ifcopenshell.api.run
+
+def create_model():
+    """最小IFC4模型：项目、米制单位、Model/Body 上下文和一个楼层，返回 (file, Body上下文, 楼层)"""
+    f = run("project.create_file", version="IFC4")
+    project = run("root.create_entity", f, ifc_class="IfcProject", name="Test")
+    run("unit.assign_unit", f, length={"is_metric": True, "raw": "METERS"})
+    model = run("context.add_context", f, context_type="Model")
+    body = run("context.add_context", f, context_type="Model", context_identifier="Body",
+               target_view="MODEL_VIEW", parent=model)
+    storey = run("root.create_entity", f, ifc_class="IfcBuildingStorey", name="Level 0")
+    run("aggregate.assign_object", f, relating_object=project, products=[storey])
+    return f, body, storey
+
+def place(f, product, position):
+    """把构件放到 position（世界坐标，无旋转）"""
+    matrix = np.eye(4)
+    matrix[:3, 3] = position
+    run("geometry.edit_object_placement", f, product=product, matrix=matrix)
+
+def add_product(f, body, ifc_class="IfcWall", name=None, length=4.0, height=3.0, thickness=0.2,
+                position=(0.0, 0.0, 0.0), storey=None, global_id=None):
+    """添加一个墙体形状（长方体）的构件，storey 给出时放入该楼层"""
+    product = run("root.create_entity", f, ifc_class=ifc_class, name=name or ifc_class)
+    if global_id:
+        product.GlobalId = global_id
+    representation = run("geometry.add_wall_representation", f, context=body, length=length, height=height,
+                         thickness=thickness)
+    run("geometry.assign_representation", f, product=product, representation=representation)
+    place(f, product, position)
+    if storey is not None:
+        run("spatial.assign_container", f, relating_structure=storey, products=[product])
+    return product
+
+@pytest.fixture
+def ifc():
+    """构造测试用IFC模型的辅助函数"""
+    return types.SimpleNamespace(run=run, create_model=create_model, add_product=add_product, place=place)
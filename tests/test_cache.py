@@ -0,0 +1,87 @@
+"""几何缓存的失效测试：修改只通过反向关系影响构件的实体后，增量导出必须与全新导出一致"""
+import json
+import os
+
+import ifcopenshell.guid
+
+import ve_bin_gltf
+
+def create_model(ifc):
+    """一面墙（带一个开洞）所在的最小IFC4模型，返回 (file, wall, opening)"""
+    f, body, storey = ifc.create_model()
+    wall = ifc.add_product(f, body, name="Wall", storey=storey)
+    opening = ifc.add_product(f, body, ifc_class="IfcOpeningElement", name="Opening", length=1.0, height=1.0,
+                              thickness=0.4, position=(1.0, -0.1, 1.0))
+    f.createIfcRelVoidsElement(ifcopenshell.guid.new(), None, None, None, wall, opening)
+    return f, wall, opening
+
+def assign_colour(ifc, f, wall, rgb):
+    """给墙的几何表示指定表面样式，返回样式的 IfcSurfaceStyleShading"""
+    style = ifc.run("style.add_style", f, name="Finish")
+    shading = ifc.run("style.add_surface_style", f, style=style, ifc_class="IfcSurfaceStyleShading", attributes={
+        "SurfaceColour": {"Name": None, "Red": rgb[0], "Green": rgb[1], "Blue": rgb[2]}
+    })
+    ifc.run("style.assign_representation_styles", f, shape_representation=wall.Representation.Representations[0],
+            styles=[style])
+    return shading
+
+def export(f, tmp_path, name, cache_dir=None, **options):
+    ifc_file_path = str(tmp_path / f"{name}.ifc")
+    f.write(ifc_file_path)
+    gltf_file_path = str(tmp_path / f"{name}.gltf")
+    ve_bin_gltf.ifc_to_gltf(ifc_file_path, gltf_file_path, cache_dir=cache_dir, verbose=False, **options)
+    with open(os.path.splitext(gltf_file_path)[0] + ".bin", "rb") as bin_file:
+        return bin_file.read()
+
+def exported_gltf(tmp_path, name):
+    with open(tmp_path / f"{name}.gltf", encoding="utf-8") as f:
+        return json.load(f)
+
+def exported_colours(tmp_path, name):
+    return [material["pbrMetallicRoughness"]["baseColorFactor"]
+            for material in exported_gltf(tmp_path, name)["materials"]]
+
+def test_cache_invalidated_by_moved_opening(ifc, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    f, _, opening = create_model(ifc)
+    before = export(f, tmp_path, "before", cache_dir)
+
+    ifc.place(f, opening, (2.5, -0.1, 1.0))
+    cached = export(f, tmp_path, "cached", cache_dir)
+    fresh = export(f, tmp_path, "fresh")
+
+    assert fresh != before
+    assert cached == fresh
+
+def test_cache_invalidated_by_changed_surface_colour(ifc, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    f, wall, _ = create_model(ifc)
+    shading = assign_colour(ifc, f, wall, (1.0, 0.0, 0.0))
+    export(f, tmp_path, "before", cache_dir)
+    assert exported_colours(tmp_path, "before")[0] == [1.0, 0.0, 0.0, 1.0]
+
+    shading.SurfaceColour.Red = 0.0
+    shading.SurfaceColour.Blue = 1.0
+    export(f, tmp_path, "cached", cache_dir)
+    assert exported_colours(tmp_path, "cached")[0] == [0.0, 0.0, 1.0, 1.0]
+
+def create_walls(ifc, walls):
+    """按顺序创建墙，walls 为 [(GlobalId, 长度)]"""
+    f, body, storey = ifc.create_model()
+    for global_id, length in walls:
+        ifc.add_product(f, body, name=global_id, length=length, storey=storey, global_id=global_id)
+    return f
+
+def test_cache_hit_not_instanced_by_renumbered_representation(ifc, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    wall_a, wall_b = ifcopenshell.guid.new(), ifcopenshell.guid.new()
+    export(create_walls(ifc, [(wall_a, 4.0)]), tmp_path, "before", cache_dir, instancing=True)
+
+    # 新增的墙B先创建，占用了墙A上一版本表示的 #id，墙A本身没有变化
+    f = create_walls(ifc, [(wall_b, 9.0), (wall_a, 4.0)])
+    cached = export(f, tmp_path, "cached", cache_dir, instancing=True)
+    fresh = export(f, tmp_path, "fresh", instancing=True)
+
+    assert len(exported_gltf(tmp_path, "fresh")["meshes"]) == 2
+    assert len(exported_gltf(tmp_path, "cached")["meshes"]) == 2
+    assert cached == fresh
@@ -0,0 +1,29 @@
+"""GLB输出测试：几何数据的临时文件在成功和出错时都要删除"""
+import os
+
+import pytest
+
+import ve_bin_gltf
+
+def write_model(ifc, tmp_path):
+    f, body, storey = ifc.create_model()
+    ifc.add_product(f, body, storey=storey)
+    ifc_file_path = str(tmp_path / "model.ifc")
+    f.write(ifc_file_path)
+    return ifc_file_path
+
+def test_temp_file_removed_after_success(ifc, tmp_path):
+    glb_file_path = str(tmp_path / "model.glb")
+    ve_bin_gltf.ifc_to_gltf(write_model(ifc, tmp_path), glb_file_path, verbose=False)
+    assert os.path.exists(glb_file_path)
+    assert not os.path.exists(glb_file_path + ".bin.tmp")
+
+def test_temp_file_removed_when_conversion_fails(ifc, tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("写入失败")
+
+    monkeypatch.setattr(ve_bin_gltf, "world_bounding_box", fail)
+    glb_file_path = str(tmp_path / "model.glb")
+    with pytest.raises(OSError):
+        ve_bin_gltf.ifc_to_gltf(write_model(ifc, tmp_path), glb_file_path, verbose=False)
+    assert not os.path.exists(glb_file_path + ".bin.tmp")
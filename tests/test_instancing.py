@@ -0,0 +1,32 @@
+"""GPU实例化测试：只有实际生成实例化节点时才声明 EXT_mesh_gpu_instancing"""
+import json
+
+import ve_bin_gltf
+
+def create_walls(ifc, lengths):
+    """沿X轴每隔10米排列的若干面墙，长度分别为 lengths"""
+    f, body, storey = ifc.create_model()
+    for i, length in enumerate(lengths):
+        ifc.add_product(f, body, name=f"Wall {i}", length=length, position=(i * 10.0, 0.0, 0.0), storey=storey)
+    return f
+
+def export(f, tmp_path):
+    ifc_file_path = str(tmp_path / "walls.ifc")
+    f.write(ifc_file_path)
+    gltf_file_path = str(tmp_path / "walls.gltf")
+    ve_bin_gltf.ifc_to_gltf(ifc_file_path, gltf_file_path, instancing=True, gpu_instancing=True, verbose=False)
+    with open(gltf_file_path, encoding="utf-8") as f:
+        return json.load(f)
+
+def instancing_nodes(gltf):
+    return [node for node in gltf["nodes"] if "EXT_mesh_gpu_instancing" in node.get("extensions", {})]
+
+def test_extension_not_declared_without_instancing_nodes(ifc, tmp_path):
+    gltf = export(create_walls(ifc, [4.0, 5.0]), tmp_path)
+    assert not instancing_nodes(gltf)
+    assert "EXT_mesh_gpu_instancing" not in gltf.get("extensionsUsed", [])
+
+def test_extension_declared_for_shared_meshes(ifc, tmp_path):
+    gltf = export(create_walls(ifc, [4.0, 4.0]), tmp_path)
+    assert len(instancing_nodes(gltf)) == 1
+    assert "EXT_mesh_gpu_instancing" in gltf["extensionsUsed"]
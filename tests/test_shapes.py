@@ -0,0 +1,43 @@
+"""多线程三角化的顺序测试"""
+import numpy as np
+import ifcopenshell.geom
+
+import ve_bin_gltf
+
+def test_threaded_order_with_curve_only_products(ifc, monkeypatch):
+    f, body, storey = ifc.create_model()
+    plan = ifc.run("context.add_context", f, context_type="Plan")
+    annotation_context = ifc.run("context.add_context", f, context_type="Plan", context_identifier="Annotation",
+                                 target_view="PLAN_VIEW", parent=plan)
+
+    # 只有曲线表示的标注放在最前面，iterator 不会产出它
+    annotation = ifc.run("root.create_entity", f, ifc_class="IfcAnnotation", name="Annotation")
+    points = [f.createIfcCartesianPoint((0.0, 0.0, 0.0)), f.createIfcCartesianPoint((1.0, 0.0, 0.0))]
+    polyline = f.createIfcPolyline(points)
+    ifc.run("geometry.assign_representation", f, product=annotation,
+            representation=f.createIfcShapeRepresentation(annotation_context, "Annotation", "Curve3D", [polyline]))
+    ifc.run("geometry.edit_object_placement", f, product=annotation, matrix=np.eye(4))
+    for i in range(8):
+        ifc.add_product(f, body, name=f"Wall {i}", position=(i * 5.0, 0.0, 0.0))
+
+    # 记录从 iterator 取得的结果数
+    results_read = []
+    create_iterator = ifcopenshell.geom.iterator
+
+    def counting_iterator(*args, **kwargs):
+        iterator = create_iterator(*args, **kwargs)
+        get = iterator.get
+        iterator.get = lambda: results_read.append(1) or get()
+        return iterator
+
+    monkeypatch.setattr(ifcopenshell.geom, "iterator", counting_iterator)
+
+    products = ve_bin_gltf.select_products(f)
+    settings = ifcopenshell.geom.settings()
+    shapes = ve_bin_gltf.iter_product_shapes(f, settings, products, num_threads=2)
+    # 标注不等待 iterator（不把后面的构件全部缓冲起来），立即以 None 产出
+    product, shape = next(shapes)
+    assert product == annotation and shape is None
+    assert not results_read
+    results = [(product.id(), shape is not None) for product, shape in shapes]
+    assert results == [(product.id(), True) for product in products[1:]]
@@ -1,11 +1,46 @@
 import ifcopenshell
 from ifcopenshell import geom
+import ifcopenshell.util.element
 import numpy as np
-from pygltflib import GLTF2, BufferFormat, BufferView, Accessor, Mesh, Primitive, Node, Scene, Buffer, Material, Asset
+from pygltflib import Asset, delete_empty_keys
 import os
+import io
 import tempfile
 import base64
 import json
+import hashlib
+import shutil
+import sqlite3
+import struct
+import sys
+import time
+import glob
+import argparse
+import contextlib
+from array import array
+import heapq
+import multiprocessing
+import multiprocessing.connection
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 可选依赖：几何压缩
+try:
+    import meshoptimizer
+except ImportError:
+    meshoptimizer = None
+try:
+    import DracoPy
+except ImportError:
+    DracoPy = None
+# 批量转换的内存限制只在类Unix系统上可用
+try:
+    import resource
+except ImportError:
+    resource = None
 
 def create_buffer_from_vertex_data(vertices, indices):
     """
@@ -35,106 +70,1035 @@ def convert_numpy_types(obj):
         return {k: convert_numpy_types(v) for k, v in obj.items()}
     return obj
 
-def convert_all_numpy_in_gltf(gltf):
-    """确保GLTF对象中的所有NumPy类型都被转换"""
-    if hasattr(gltf, 'nodes'):
-        for node in gltf.nodes:
-            if hasattr(node, 'matrix'):
-                node.matrix = convert_numpy_types(node.matrix)
-            if hasattr(node, 'extras'):
-                node.extras = convert_numpy_types(node.extras)
+# glTF 顶层字段的输出顺序（与 pygltflib 的 GLTF2 字段顺序一致）
+GLTF_KEYS = ("extensions", "extras", "accessors", "animations", "asset", "bufferViews", "buffers", "cameras",
+             "extensionsUsed", "extensionsRequired", "images", "materials", "meshes", "nodes", "samplers",
+             "scene", "scenes", "skins", "textures")
+
+def json_default(obj):
+    """JSON序列化时把剩余的 NumPy 类型转换为 Python 原生类型，代替整体遍历转换"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, (np.integer, np.floating)):
+        return convert_numpy_types(obj)
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+# accessor 类型在 accessor 表中按编号保存
+ACCESSOR_TYPES = ("SCALAR", "VEC2", "VEC3", "VEC4", "MAT2", "MAT3", "MAT4")
+
+def gltf_buffer_view_table():
+    """
+    bufferView 表：元数据按列保存在紧凑数组中，不为每个bufferView创建字典，写出时由 gltf_buffer_view 逐个生成
+    byteStride、target 为 0 表示没有；扩展信息（meshopt）按bufferView索引单独保存
+    """
+    return {
+        "length": 0,
+        "buffer": array("H"),
+        "byteOffset": array("Q"),
+        "byteLength": array("Q"),
+        "byteStride": array("B"),
+        "target": array("H"),
+        "extensions": {}
+    }
+
+def add_gltf_buffer_view(table, buffer, byte_offset, byte_length, byte_stride=None, target=None, extensions=None):
+    """在bufferView表中追加一行，返回bufferView索引"""
+    index = table["length"]
+    table["buffer"].append(buffer)
+    table["byteOffset"].append(byte_offset)
+    table["byteLength"].append(byte_length)
+    table["byteStride"].append(byte_stride or 0)
+    table["target"].append(target or 0)
+    if extensions:
+        table["extensions"][index] = extensions
+    table["length"] += 1
+    return index
+
+def gltf_buffer_view(table, index):
+    """bufferView 字典，只包含需要输出的字段，字段顺序与输出一致"""
+    extensions = table["extensions"].get(index)
+    view = {"extensions": extensions} if extensions else {}
+    view["buffer"] = table["buffer"][index]
+    view["byteOffset"] = table["byteOffset"][index]
+    view["byteLength"] = table["byteLength"][index]
+    if table["byteStride"][index]:
+        view["byteStride"] = table["byteStride"][index]
+    if table["target"][index]:
+        view["target"] = table["target"][index]
+    return view
+
+def gltf_accessor_table():
+    """
+    accessor 表：元数据按列保存在紧凑数组中，写出时由 gltf_accessor 逐个生成字典
+    bufferView 为 -1 表示没有；max/min 依次保存在 bounds 中，bounds_start/bounds_size 为起点和分量数（0 表示没有），
+    integer_bounds 记录原值是否为整数，保证输出的数字格式不变
+    """
+    return {
+        "length": 0,
+        "bufferView": array("q"),
+        "componentType": array("H"),
+        "normalized": array("B"),
+        "count": array("Q"),
+        "type": array("B"),
+        "bounds_start": array("Q"),
+        "bounds_size": array("B"),
+        "integer_bounds": array("B"),
+        "bounds": array("d")
+    }
+
+def add_gltf_accessor(table, component_type, count, accessor_type, buffer_view=None, normalized=False,
+                      max_value=None, min_value=None):
+    """在accessor表中追加一行，返回accessor索引"""
+    index = table["length"]
+    table["bufferView"].append(-1 if buffer_view is None else buffer_view)
+    table["componentType"].append(component_type)
+    table["normalized"].append(normalized)
+    table["count"].append(count)
+    table["type"].append(ACCESSOR_TYPES.index(accessor_type))
+    table["bounds_start"].append(len(table["bounds"]))
+    if max_value is None:
+        table["bounds_size"].append(0)
+        table["integer_bounds"].append(False)
+    else:
+        table["bounds_size"].append(len(max_value))
+        table["integer_bounds"].append(all(isinstance(value, int) for value in max_value + min_value))
+        table["bounds"].extend(max_value)
+        table["bounds"].extend(min_value)
+    table["length"] += 1
+    return index
+
+def gltf_accessor(table, index):
+    """accessor 字典；没有 bufferView 的accessor（Draco解码数据）不能带 byteOffset"""
+    buffer_view = table["bufferView"][index]
+    accessor = {"bufferView": buffer_view, "byteOffset": 0} if buffer_view >= 0 else {}
+    accessor["componentType"] = table["componentType"][index]
+    accessor["normalized"] = bool(table["normalized"][index])
+    accessor["count"] = table["count"][index]
+    accessor["type"] = ACCESSOR_TYPES[table["type"][index]]
+    size = table["bounds_size"][index]
+    if size:
+        start = table["bounds_start"][index]
+        bounds = table["bounds"][start:start + 2 * size].tolist()
+        if table["integer_bounds"][index]:
+            bounds = [int(value) for value in bounds]
+        accessor["max"] = bounds[:size]
+        accessor["min"] = bounds[size:]
+    return accessor
+
+# 按列保存的顶层字段及其逐行生成字典的函数
+GLTF_TABLES = {"accessors": gltf_accessor, "bufferViews": gltf_buffer_view}
+
+def gltf_primitive(attributes, indices, material, extensions=None):
+    """三角形primitive字典"""
+    return {
+        "extensions": extensions or {},
+        "attributes": attributes,
+        "indices": indices,
+        "mode": 4,  # TRIANGLES
+        "material": material
+    }
+
+def gltf_node(mesh, name, extensions=None, extras=None):
+    """node 字典；extensions、extras、matrix 预先占位，之后赋值不改变字段顺序，空值在写出时省略"""
+    return {"extensions": extensions or {}, "extras": extras or {}, "mesh": mesh, "matrix": None, "name": name}
+
+def write_gltf_json(gltf, f, indent="  "):
+    """
+    流式写出glTF JSON：顶层字段按 GLTF_KEYS 的顺序，数组逐个元素序列化后直接写入文件，不构建整个文档的对象图和字符串
+    accessors、bufferViews 为按列保存的表（见 GLTF_TABLES），写出时逐行生成字典
+    None、空列表、空字典按 pygltflib 的规则省略，indent 为 None 时输出紧凑格式（GLB）
+    """
+    encoder = json.JSONEncoder(
+        skipkeys=True,
+        allow_nan=False,
+        indent=indent,
+        separators=(",", ": ") if indent else (",", ":"),
+        default=json_default
+    )
+    newline = "\n" + indent if indent else ""
+    item_newline = newline + indent if indent else ""
+    
+    f.write("{")
+    separator = ""
+    for key in GLTF_KEYS:
+        value = gltf.get(key)
+        items = value if isinstance(value, list) else None
+        if key in GLTF_TABLES and isinstance(value, dict):
+            # 按列保存的表逐行生成字典，写出后即释放，不同时保留全部字典
+            row, table = GLTF_TABLES[key], value
+            items = value = [] if not table["length"] else (row(table, index) for index in range(table["length"]))
+        if value is None or (hasattr(value, "__len__") and len(value) == 0):
+            continue
+        f.write(f"{separator}{newline}{encoder.encode(key)}{encoder.key_separator}")
+        separator = ","
+        if items is not None:
+            f.write("[")
+            for i, item in enumerate(items):
+                if isinstance(item, dict):
+                    delete_empty_keys(item)
+                f.write(("," if i else "") + item_newline + encoder.encode(item).replace("\n", item_newline))
+            f.write(newline + "]")
+        else:
+            if isinstance(value, dict):
+                delete_empty_keys(value)
+            f.write(encoder.encode(value).replace("\n", newline))
+    f.write("\n}" if indent else "}")
+
+def compute_normals(vertices, faces, mode="average", crease_angle=30.0):
+    """
+    批量计算顶点法线（全部为NumPy向量运算，没有Python级循环）
+    mode:
+        "average" - 相邻面单位法线等权平均（与原逐面循环的结果一致）
+        "area"    - 按三角形面积加权的平滑法线
+        "flat"    - 带折痕角的硬边法线，夹角超过 crease_angle（度）的面不参与平均，
+                    因此会拆分顶点，返回新的 vertices 和 faces
+    不足三个索引的尾部数据、索引越界的三角形会被丢弃（所有模式返回的 faces 都只含合法三角形），退化三角形不会产生NaN
+    返回 (vertices, normals, faces)
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(faces).ravel()
+    default_normal = np.array([0.0, 1.0, 0.0])
+    vertex_count = len(vertices)
+
+    # 只保留完整且索引合法的三角形
+    triangles = faces[:len(faces) - len(faces) % 3].reshape(-1, 3).astype(np.int64)
+    triangles = triangles[((triangles >= 0) & (triangles < vertex_count)).all(axis=1)]
+
+    faces = triangles.ravel()
+
+    if len(triangles) == 0:
+        normals = np.tile(default_normal, (vertex_count, 1))
+        return vertices, normals, faces
+
+    v1 = vertices[triangles[:, 0]]
+    v2 = vertices[triangles[:, 1]]
+    v3 = vertices[triangles[:, 2]]
+    # 叉积长度为三角形面积的两倍
+    face_normals = np.cross(v2 - v1, v3 - v1)
+    lengths = np.linalg.norm(face_normals, axis=1)
+    degenerate = lengths <= 0
+    unit_normals = np.empty_like(face_normals)
+    unit_normals[~degenerate] = face_normals[~degenerate] / lengths[~degenerate, None]
+
+    def normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=1)
+        result = np.tile(default_normal, (len(vectors), 1))
+        valid = norms > 0
+        result[valid] = vectors[valid] / norms[valid, None]
+        return result
+
+    def scatter_sum(indices, values, size):
+        return np.stack([np.bincount(indices, weights=values[:, k], minlength=size) for k in range(3)], axis=1)
+
+    corner_vertices = triangles.ravel()
+
+    if mode == "average":
+        # 与原实现一致：退化三角形按 (0, 1, 0) 计入平均
+        unit_normals[degenerate] = default_normal
+        normals = normalize(scatter_sum(corner_vertices, np.repeat(unit_normals, 3, axis=0), vertex_count))
+        return vertices, normals, faces
+
+    if mode == "area":
+        normals = normalize(scatter_sum(corner_vertices, np.repeat(face_normals, 3, axis=0), vertex_count))
+        return vertices, normals, faces
+
+    if mode != "flat":
+        raise ValueError(f"不支持的法线模式: {mode}")
+
+    # 硬边法线：对每个三角形角点，累加同一顶点上与本面夹角不超过折痕角的相邻面法线
+    # 同一顶点上法线方向相同的面先合并为一类（共面的扇形三角形只剩一类），只在类之间两两比较
+    unit_normals[degenerate] = 0.0
+    corner_faces = np.repeat(np.arange(len(triangles)), 3)
+    class_keys = np.column_stack([corner_vertices, np.round(unit_normals[corner_faces] * 1e6)])
+    _, class_first, corner_classes = np.unique(class_keys, axis=0, return_index=True, return_inverse=True)
+    corner_classes = corner_classes.ravel()
+    class_vertices = corner_vertices[class_first]
+    class_units = unit_normals[corner_faces[class_first]]
+    class_count = len(class_first)
+    class_sums = scatter_sum(corner_classes, face_normals[corner_faces], class_count)
+
+    # 类按顶点排序，同一顶点的类连续排列；逐块配对，每块最多约 max_pairs 对，内存不随顶点的邻面数平方增长
+    group_starts = np.flatnonzero(np.r_[True, class_vertices[1:] != class_vertices[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, class_count])
+    row_group_starts = np.repeat(group_starts, group_sizes)
+    row_sizes = np.repeat(group_sizes, group_sizes)
+    row_pair_ends = np.cumsum(row_sizes)
+    cos_limit = np.cos(np.radians(crease_angle))
+    max_pairs = 1 << 20
+    class_normals = np.zeros((class_count, 3))
+    row = 0
+    while row < class_count:
+        done = row_pair_ends[row - 1] if row else 0
+        end = max(int(np.searchsorted(row_pair_ends, done + max_pairs, side="right")), row + 1)
+        counts = row_sizes[row:end]
+        first = np.repeat(np.arange(row, end), counts)
+        offsets = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = np.repeat(row_group_starts[row:end], counts) + offsets
+        smooth = np.einsum("ij,ij->i", class_units[first], class_units[second]) >= cos_limit - 1e-6
+        class_normals[row:end] = scatter_sum(first[smooth] - row, class_sums[second[smooth]], end - row)
+        row = end
+    corner_normals = normalize(class_normals)[corner_classes]
+
+    # 按 (原顶点, 法线) 去重，法线不同的角点拆分为独立顶点
+    keys = np.column_stack([corner_vertices, np.round(corner_normals * 1e5)])
+    _, first_corner, new_faces = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    new_vertices = vertices[corner_vertices[first_corner]]
+    normals = corner_normals[first_corner]
+    return new_vertices, normals, new_faces.ravel()
+
+def matrices_to_trs(matrices):
+    """
+    将一组列主序4x4矩阵分解为平移、旋转（四元数 xyzw）、缩放
+    返回 (translations, rotations, scales, valid)，valid 标记能否无损分解（无剪切）
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4).transpose(0, 2, 1)
+    translations = matrices[:, :3, 3]
+    linear = matrices[:, :3, :3]
     
-    if hasattr(gltf, 'accessors'):
-        for accessor in gltf.accessors:
-            if hasattr(accessor, 'max'):
-                accessor.max = convert_numpy_types(accessor.max)
-            if hasattr(accessor, 'min'):
-                accessor.min = convert_numpy_types(accessor.min)
+    scales = np.linalg.norm(linear, axis=1)
+    # 镜像变换：把负号放到X轴缩放上
+    mirrored = np.linalg.det(linear) < 0
+    scales[mirrored, 0] *= -1
+    safe_scales = np.where(scales == 0, 1.0, scales)
+    rotation = linear / safe_scales[:, None, :]
+    valid = (scales != 0).all(axis=1) & np.all(
+        np.abs(rotation @ rotation.transpose(0, 2, 1) - np.eye(3)) < 1e-5, axis=(1, 2)
+    )
+    
+    r = rotation
+    w = np.sqrt(np.maximum(0.0, 1 + r[:, 0, 0] + r[:, 1, 1] + r[:, 2, 2])) / 2
+    x = np.copysign(np.sqrt(np.maximum(0.0, 1 + r[:, 0, 0] - r[:, 1, 1] - r[:, 2, 2])) / 2, r[:, 2, 1] - r[:, 1, 2])
+    y = np.copysign(np.sqrt(np.maximum(0.0, 1 - r[:, 0, 0] + r[:, 1, 1] - r[:, 2, 2])) / 2, r[:, 0, 2] - r[:, 2, 0])
+    z = np.copysign(np.sqrt(np.maximum(0.0, 1 - r[:, 0, 0] - r[:, 1, 1] + r[:, 2, 2])) / 2, r[:, 1, 0] - r[:, 0, 1])
+    rotations = np.stack([x, y, z, w], axis=1)
+    rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+    
+    return (translations.astype(np.float32), rotations.astype(np.float32),
+            scales.astype(np.float32), valid)
+
+def quantize_positions(vertices):
+    """
+    顶点坐标量化为归一化int16（KHR_mesh_quantization），以mesh包围盒中心和最大半边长为基准，
+    使用统一缩放，法线不受反量化变换影响
+    返回 (int16数组(N, 4)，第4列为对齐填充, 反量化矩阵(列主序16个数))
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    lower = vertices.min(axis=0)
+    upper = vertices.max(axis=0)
+    center = (lower + upper) / 2
+    half_extent = float((upper - lower).max()) / 2
+    if half_extent <= 0:
+        half_extent = 1.0
     
-    if hasattr(gltf, 'extras'):
-        gltf.extras = convert_numpy_types(gltf.extras)
+    quantized = np.zeros((len(vertices), 4), dtype=np.int16)
+    quantized[:, :3] = np.round((vertices - center) / half_extent * 32767)
     
-    return gltf
+    # 归一化int16解码后为 q / 32767，反量化只需再乘以半边长并平移到中心
+    matrix = np.diag([half_extent, half_extent, half_extent, 1.0])
+    matrix[:3, 3] = center
+    return quantized, matrix.T.ravel()
+
+def quantize_normals(normals):
+    """法线量化为归一化int8，返回int8数组(N, 4)，第4列为对齐填充"""
+    quantized = np.zeros((len(normals), 4), dtype=np.int8)
+    quantized[:, :3] = np.round(np.clip(normals, -1.0, 1.0) * 127)
+    return quantized
+
+def compact_indices(indices):
+    """
+    按最大索引选择最小的索引类型，返回 (索引数组, componentType)
+    glTF规定索引不能等于该类型的最大值，因此 uint8 只用到254，uint16 只用到65534
+    """
+    max_index = int(indices.max()) if len(indices) else 0
+    if max_index < 255:
+        return indices.astype(np.uint8), 5121  # UNSIGNED_BYTE
+    if max_index < 65535:
+        return indices.astype(np.uint16), 5123  # UNSIGNED_SHORT
+    return indices.astype(np.uint32), 5125  # UNSIGNED_INT
+
+def multiply_matrices(first, second):
+    """两个列主序4x4矩阵相乘（first * second），返回列主序16个数"""
+    first = np.asarray(first, dtype=np.float64).reshape(4, 4).T
+    second = np.asarray(second, dtype=np.float64).reshape(4, 4).T
+    return (first @ second).T.ravel()
 
-def ifc_to_gltf(ifc_file_path, gltf_file_path):
+def optimize_mesh(vertices, index_parts, attributes=()):
+    """
+    使用 meshoptimizer 重排三角形以提高顶点缓存命中率并减少overdraw，
+    再按索引首次出现的顺序重排顶点（同时去掉未被引用的顶点）
+    index_parts: 共用顶点的各组索引（每个材质一组），三角形只在组内重排
+    attributes: 需要与顶点一起重排的其他逐顶点数组
+    返回 (vertices, index_parts, attributes)；索引不合法时原样返回
+    """
+    vertex_count = len(vertices)
+    if any(len(indices) == 0 or len(indices) % 3 or int(indices.max()) >= vertex_count for indices in index_parts):
+        return vertices, list(index_parts), list(attributes)
+    
+    positions = np.ascontiguousarray(vertices, dtype=np.float32)
+    optimized_parts = []
+    for indices in index_parts:
+        indices = np.ascontiguousarray(indices, dtype=np.uint32)
+        cache_optimized = np.empty_like(indices)
+        meshoptimizer.optimize_vertex_cache(cache_optimized, indices, len(indices), vertex_count)
+        overdraw_optimized = np.empty_like(indices)
+        meshoptimizer.optimize_overdraw(overdraw_optimized, cache_optimized, positions,
+                                        len(indices), vertex_count, 12, 1.05)
+        optimized_parts.append(overdraw_optimized)
+    
+    all_indices = np.concatenate(optimized_parts)
+    remap = np.empty(vertex_count, dtype=np.uint32)
+    unique_count = meshoptimizer.optimize_vertex_fetch_remap(remap, all_indices, len(all_indices), vertex_count)
+    used = remap != np.iinfo(np.uint32).max
+    
+    def reorder(array):
+        result = np.empty((unique_count,) + array.shape[1:], dtype=array.dtype)
+        result[remap[used]] = array[used]
+        return result
+    
+    return reorder(vertices), [remap[indices] for indices in optimized_parts], [reorder(a) for a in attributes]
+
+def extract_submesh(vertices, indices, attributes=()):
+    """只保留 indices 引用到的顶点并重新编号，返回 (vertices, indices, attributes)"""
+    used, remapped = np.unique(indices, return_inverse=True)
+    return vertices[used], remapped.ravel().astype(np.uint32), [a[used] for a in attributes]
+
+def simplify_lods(vertices, indices, ratios, target_error=0.02):
+    """
+    使用 meshoptimizer 的二次误差简化，为每个比例生成一组简化后的索引（与原mesh共用顶点）
+    ratios: 相对原三角形数的目标比例，如 (0.5, 0.2)
+    target_error: 允许的最大误差（相对mesh尺寸）；三角形数减少不到10%时不再生成更低的级别
+    """
+    if len(indices) < 3 or len(indices) % 3:
+        return []
+    indices = np.ascontiguousarray(indices, dtype=np.uint32)
+    positions = np.ascontiguousarray(vertices, dtype=np.float32)
+    
+    lods = []
+    previous_count = len(indices)
+    for ratio in ratios:
+        target_count = max(int(len(indices) * ratio) // 3 * 3, 3)
+        destination = np.empty_like(indices)
+        count = meshoptimizer.simplify(destination, indices, positions, len(indices), len(positions), 12,
+                                       target_count, target_error)
+        if count == 0 or count > previous_count * 0.9:
+            break
+        lods.append(destination[:count].copy())
+        previous_count = count
+    return lods
+
+def simplify_part_lods(vertices, parts, ratios):
+    """
+    对每个材质的索引分别简化，返回各级LOD的 [(材质, 索引)] 列表
+    级别数取各部分中最多的，级别不足的部分沿用它最低的一级（没有简化结果时用原索引）
+    """
+    part_lods = [simplify_lods(vertices, indices, ratios) for _, indices in parts]
+    levels = max(len(lods) for lods in part_lods)
+    return [
+        [(material, lods[min(level, len(lods) - 1)] if lods else indices)
+         for (material, indices), lods in zip(parts, part_lods)]
+        for level in range(levels)
+    ]
+
+def resolve_style(style):
+    """
+    把IfcOpenShell几何中的表面样式解析为材质参数 {"name", "color": [r, g, b, a], "specular": [r, g, b] 或 None}
+    没有对应的IfcSurfaceStyle（IfcOpenShell按构件类型给出的默认颜色）或没有颜色时返回 None
+    """
+    # 默认样式的 instance 是空的实体包装，只能按真值判断
+    if not style.instance or style.diffuse is None:
+        return None
+    color = [float(style.diffuse.r()), float(style.diffuse.g()), float(style.diffuse.b())]
+    if any(np.isnan(color)):
+        return None
+    transparency = style.transparency
+    alpha = 1.0 if transparency is None or np.isnan(transparency) else 1.0 - float(transparency)
+    
+    specular = None
+    if style.specular is not None:
+        specular = [float(style.specular.r()), float(style.specular.g()), float(style.specular.b())]
+        if any(np.isnan(specular)) or not any(specular):
+            specular = None
+    
+    return {
+        "name": getattr(style.instance, "Name", None) or style.name,
+        "color": color + [alpha],
+        "specular": specular
+    }
+
+def write_glb(gltf, glb_file_path, bin_file_path, bin_length):
+    """
+    把glTF JSON和已写好的.bin数据组装为单文件GLB容器
+    JSON块用空格、BIN块用0补齐到4字节，BIN数据分块复制，不整体读入内存
+    """
+    json_text = io.StringIO()
+    write_gltf_json(gltf, json_text, indent=None)
+    json_data = json_text.getvalue().encode("utf-8")
+    json_data += b" " * (-len(json_data) % 4)
+    bin_padding = -bin_length % 4
+    
+    total_length = 12 + 8 + len(json_data)
+    if bin_length:
+        total_length += 8 + bin_length + bin_padding
+    
+    with open(glb_file_path, "wb") as f:
+        # 文件头: magic "glTF", 版本2, 总长度
+        f.write(struct.pack("<III", 0x46546C67, 2, total_length))
+        f.write(struct.pack("<II", len(json_data), 0x4E4F534A))  # JSON
+        f.write(json_data)
+        if bin_length:
+            f.write(struct.pack("<II", bin_length + bin_padding, 0x004E4942))  # BIN
+            with open(bin_file_path, "rb") as bin_file:
+                shutil.copyfileobj(bin_file, f, 16 * 1024 * 1024)
+            f.write(b"\x00" * bin_padding)
+
+def index_relationships(ifc_file):
+    """
+    一次扫描关系实体，建立 构件id -> 属性集 / 类型 / 材质 / 开洞 的索引，
+    避免对每个构件分别遍历 IsDefinedBy、IsTypedBy、HasAssociations、HasOpenings
+    返回 {"psets": {id: [属性集]}, "types": {id: [类型]}, "materials": {id: [材质]}, "openings": {id: [开洞构件]},
+          "styles": {表示项或材质id: [IfcStyledItem / IfcMaterialDefinitionRepresentation]}}，
+    列表保持关系在文件中的顺序
+    """
+    index = {"psets": {}, "types": {}, "materials": {}, "openings": {}, "styles": {}}
+    
+    for rel in ifc_file.by_type("IfcRelDefinesByProperties"):
+        definitions = rel.RelatingPropertyDefinition
+        # IFC4 中可能是 IfcPropertySetDefinitionSet（属性集列表）
+        if not isinstance(definitions, (list, tuple)):
+            definitions = [definitions]
+        property_sets = [d for d in definitions if d.is_a("IfcPropertySet")]
+        for obj in rel.RelatedObjects:
+            index["psets"].setdefault(obj.id(), []).extend(property_sets)
+    
+    for rel in ifc_file.by_type("IfcRelDefinesByType"):
+        for obj in rel.RelatedObjects:
+            index["types"].setdefault(obj.id(), []).append(rel.RelatingType)
+    
+    for rel in ifc_file.by_type("IfcRelAssociatesMaterial"):
+        for obj in rel.RelatedObjects:
+            index["materials"].setdefault(obj.id(), []).append(rel.RelatingMaterial)
+    
+    # 开洞通过反向关系影响构件几何（布尔剪切），缓存键需要包含开洞的位置和形状
+    for rel in ifc_file.by_type("IfcRelVoidsElement"):
+        index["openings"].setdefault(rel.RelatingBuildingElement.id(), []).append(rel.RelatedOpeningElement)
+    
+    # 表面样式同样是反向关系：IfcStyledItem 指向表示项，IfcMaterialDefinitionRepresentation 指向材质
+    for styled_item in ifc_file.by_type("IfcStyledItem"):
+        if styled_item.Item is not None:
+            index["styles"].setdefault(styled_item.Item.id(), []).append(styled_item)
+    for representation in ifc_file.by_type("IfcMaterialDefinitionRepresentation"):
+        index["styles"].setdefault(representation.RepresentedMaterial.id(), []).append(representation)
+    
+    return index
+
+def hash_entity_graph(roots, inverses=None):
+    """
+    对从 roots 出发沿正向引用可达的全部实体内容求哈希
+    inverses: {实体id: [实体]}，遍历到该实体时一并加入的反向关联实体（如表示项上的样式）
+    引用按遍历顺序编号而不是使用文件中的 #id，文件重新编号不影响结果；IfcOwnerHistory 不参与哈希
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    positions = {}
+    queue = []
+    
+    def token(value):
+        if isinstance(value, ifcopenshell.entity_instance):
+            if value.id() == 0:
+                # 内联的类型值，例如 IfcLabel('...')
+                return f"{value.is_a()}({token(value.wrappedValue)})"
+            if value.is_a("IfcOwnerHistory"):
+                return "*"
+            if value.id() not in positions:
+                positions[value.id()] = len(positions)
+                queue.append(value)
+            return f"#{positions[value.id()]}"
+        if isinstance(value, (list, tuple)):
+            return "(" + ",".join(token(v) for v in value) + ")"
+        return repr(value)
+    
+    for root in roots:
+        token(root)
+    index = 0
+    while index < len(queue):
+        entity = queue[index]
+        index += 1
+        digest.update(f"{entity.is_a()}({','.join(token(v) for v in entity)});".encode("utf-8"))
+        if inverses:
+            for related in inverses.get(entity.id(), ()):
+                digest.update(f"<{token(related)};".encode("utf-8"))
+    return digest.hexdigest()
+
+def cache_entry_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], key + ".npz")
+
+def load_cached_geometry(cache_dir, key):
+    """读取缓存的几何与属性，未命中返回 None；命中时更新文件时间，用于LRU淘汰"""
+    path = cache_entry_path(cache_dir, key)
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            entry = {
+                "vertices": data["vertices"],
+                "normals": data["normals"],
+                "indices": data["indices"],
+                "matrix": data["matrix"],
+                "material_ids": data["material_ids"],
+                "materials": json.loads(str(data["materials"])),
+                # 几何id是文件内的 #id，重新编号后可能指向另一个表示，不跨会话保存
+                "geometry_id": None,
+                "extras": json.loads(str(data["extras"]))
+            }
+        os.utime(path)
+        return entry
+    except (OSError, KeyError, ValueError):
+        return None
+
+def store_cached_geometry(cache_dir, key, entry):
+    """写入缓存条目，先写临时文件再替换，多个进程共用缓存目录时不会读到半个文件"""
+    path = cache_entry_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(
+            f,
+            vertices=entry["vertices"],
+            normals=entry["normals"],
+            indices=entry["indices"],
+            matrix=entry["matrix"],
+            material_ids=entry["material_ids"],
+            materials=np.array(json.dumps(entry["materials"], ensure_ascii=False)),
+            extras=np.array(json.dumps(entry["extras"], ensure_ascii=False, default=convert_numpy_types))
+        )
+    os.replace(temp_path, path)
+
+def evict_cache(cache_dir, max_bytes):
+    """缓存目录超过 max_bytes 时，按最近使用时间从旧到新删除条目"""
+    entries = []
+    total = 0
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+def world_bounding_box(vertices, matrix=None):
+    """计算顶点的世界坐标包围盒，matrix 为局部坐标几何的列主序变换矩阵"""
+    lower = vertices.min(axis=0).astype(np.float64)
+    upper = vertices.max(axis=0).astype(np.float64)
+    if matrix is None:
+        return lower, upper
+    corners = np.array([[x, y, z, 1.0] for x in (lower[0], upper[0])
+                        for y in (lower[1], upper[1]) for z in (lower[2], upper[2])])
+    corners = corners @ np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+    return corners[:, :3].min(axis=0), corners[:, :3].max(axis=0)
+
+# 不会被三角化的表示：轴线、平面标注、轮廓等，以及只含曲线/点的表示类型
+NON_BODY_IDENTIFIERS = {"Axis", "FootPrint", "Annotation", "Profile", "Reference", "Clearance", "CoG", "Lighting"}
+NON_BODY_TYPES = {"Curve", "Curve2D", "Curve3D", "GeometricCurveSet", "Annotation2D", "Point", "PointCloud"}
+
+def has_body_representation(product):
+    """
+    构件是否可能有三维几何：所有表示都明确是轴线、标注等曲线/点表示时返回 False
+    判断从宽，不确定的表示都当作可能三角化
+    """
+    for representation in product.Representation.Representations:
+        if (representation.RepresentationIdentifier not in NON_BODY_IDENTIFIERS
+                and representation.RepresentationType not in NON_BODY_TYPES):
+            return True
+    return False
+
+def iter_product_shapes(ifc_file, settings, products, num_threads=1):
+    """
+    按 products 的顺序逐个产出 (product, shape)，三角化失败的构件 shape 为 None
+    num_threads > 1 时使用 ifcopenshell.geom.iterator 多线程三角化，
+    iterator 的产出顺序不固定，这里按原顺序重排，保证输出与单线程一致；
+    iterator 不会产出没有三维几何的构件，这些构件预先筛掉，不在重排缓冲区中等待
+    """
+    if num_threads is None:
+        num_threads = os.cpu_count() or 1
+
+    if num_threads <= 1 or not products:
+        for product in products:
+            try:
+                shape = ifcopenshell.geom.create_shape(settings, product)
+            except RuntimeError as e:
+                print(f"警告: 处理产品 {product.is_a()} (GlobalId: {product.GlobalId}) 时出错: {str(e)}")
+                shape = None
+            yield product, shape
+        return
+
+    geometric = [product for product in products if has_body_representation(product)]
+    skipped = {product.id() for product in products} - {product.id() for product in geometric}
+
+    # 重排缓冲区：只缓存先于前面构件完成的结果，按顺序尽早产出
+    pending = {}
+    next_index = 0
+    
+    def ready():
+        """按顺序产出已完成的构件，遇到还没完成的构件时停止"""
+        nonlocal next_index
+        while next_index < len(products):
+            product = products[next_index]
+            if product.id() in skipped:
+                print(f"警告: 处理产品 {product.is_a()} (GlobalId: {product.GlobalId}) 时出错: 没有三维几何表示")
+                yield product, None
+            elif product.id() in pending:
+                yield product, pending.pop(product.id())
+            else:
+                return
+            next_index += 1
+    
+    yield from ready()
+    if geometric:
+        iterator = ifcopenshell.geom.iterator(settings, ifc_file, num_threads, include=geometric)
+        if iterator.initialize():
+            while True:
+                shape = iterator.get()
+                pending[shape.id] = shape
+                yield from ready()
+                if not iterator.next():
+                    break
+
+    # iterator 不会产出三角化失败的构件，剩余的按顺序补齐
+    for product in products[next_index:]:
+        shape = pending.pop(product.id(), None)
+        if shape is None:
+            print(f"警告: 处理产品 {product.is_a()} (GlobalId: {product.GlobalId}) 时出错: 几何生成失败")
+        yield product, shape
+
+def peak_memory_bytes():
+    """进程的峰值常驻内存（字节），不支持的系统返回 None"""
+    # Linux 的 ru_maxrss 在 fork/exec 时继承父进程的值，优先读取当前地址空间的峰值 VmHWM
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 的单位是KB，macOS 是字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def buffer_usage(gltf):
+    """按用途（顶点属性名、indices、instancing、draco）统计bufferView占用的字节数，meshopt按压缩后大小计"""
+    categories = {}
+    
+    def mark(accessor_index, category):
+        if accessor_index is not None and gltf["accessors"]["bufferView"][accessor_index] >= 0:
+            categories.setdefault(gltf["accessors"]["bufferView"][accessor_index], category)
+    
+    for mesh in gltf["meshes"]:
+        for primitive in mesh["primitives"]:
+            for name, accessor_index in primitive["attributes"].items():
+                mark(accessor_index, name)
+            mark(primitive.get("indices"), "indices")
+            draco = primitive.get("extensions", {}).get("KHR_draco_mesh_compression")
+            if draco:
+                categories.setdefault(draco["bufferView"], "draco")
+    for node in gltf["nodes"]:
+        instancing = node.get("extensions", {}).get("EXT_mesh_gpu_instancing")
+        if instancing:
+            for accessor_index in instancing["attributes"].values():
+                mark(accessor_index, "instancing")
+    
+    usage = {}
+    views = gltf["bufferViews"]
+    for index in range(views["length"]):
+        meshopt = views["extensions"].get(index, {}).get("EXT_meshopt_compression")
+        category = categories.get(index, "other")
+        usage[category] = usage.get(category, 0) + (meshopt["byteLength"] if meshopt else views["byteLength"][index])
+    return usage
+
+def select_products(ifc_file, include_classes=None, exclude_classes=None, storeys=None, global_ids=None):
+    """
+    在三角化之前筛选要导出的构件（有几何表示的 IfcProduct），各条件同时生效
+    include_classes / exclude_classes: 包含 / 排除的IFC类型（含子类），如 ["IfcWall", "IfcSlab"]
+    storeys: 只导出这些楼层（名称或GlobalId）中的构件
+    global_ids: 只导出这些 GlobalId 对应的构件
+    """
+    def class_members(classes):
+        if isinstance(classes, str):
+            classes = [classes]
+        ids = set()
+        for ifc_class in classes:
+            try:
+                ids.update(element.id() for element in ifc_file.by_type(ifc_class))
+            except RuntimeError:
+                raise ValueError(f"未知的IFC类型: {ifc_class}")
+        return ids
+    
+    products = [product for product in ifc_file.by_type("IfcProduct") if product.Representation]
+    if include_classes:
+        included = class_members(include_classes)
+        products = [product for product in products if product.id() in included]
+    if exclude_classes:
+        excluded = class_members(exclude_classes)
+        products = [product for product in products if product.id() not in excluded]
+    if storeys:
+        storeys = {storeys} if isinstance(storeys, str) else set(storeys)
+        selected = {
+            storey.id() for storey in ifc_file.by_type("IfcBuildingStorey")
+            if storey.GlobalId in storeys or storey.Name in storeys
+        }
+        if not selected:
+            raise ValueError(f"没有找到楼层: {', '.join(sorted(storeys))}")
+        storey_of = {}
+        for product in products:
+            storey = get_storey(product)
+            storey_of[product.id()] = storey.id() if storey else None
+        products = [product for product in products if storey_of[product.id()] in selected]
+    if global_ids is not None:
+        global_ids = set(global_ids)
+        products = [product for product in products if product.GlobalId in global_ids]
+    return products
+
+def ifc_to_gltf(ifc_file_path, gltf_file_path, num_threads=1, normal_mode="average", crease_angle=30.0,
+                instancing=False, gpu_instancing=False, batching=False, batch_vertex_limit=65536,
+                quantize=False, compression=None, draco_quantization_bits=14, property_sidecar=False,
+                cache_dir=None, cache_max_bytes=2 * 1024 ** 3, global_ids=None, lod_ratios=None,
+                include_classes=None, exclude_classes=None, storeys=None, products=None,
+                relationship_index=None, verbose=True, profile=False, profile_top=20):
     """
     将IFC文件转换为GLTF格式，保持每个构件的唯一性，并添加扩展支持
+    gltf_file_path 以 .glb 结尾时输出单文件GLB，否则输出 .gltf + .bin
+    num_threads: 三角化使用的线程数，大于1时启用多线程，None 表示使用全部CPU核心
+    normal_mode: IfcOpenShell 未返回法线时的计算方式，见 compute_normals
+    crease_angle: normal_mode 为 "flat" 时的折痕角（度）
+    instancing: 几何实例化，以局部坐标导出几何，共享表示或内容相同的几何只写一份mesh，
+                构件节点通过变换矩阵引用
+    gpu_instancing: 在 instancing 基础上，把共享mesh的节点合并为 EXT_mesh_gpu_instancing 节点
+    batching: 合批输出，按材质把构件合并为少量大mesh，每个顶点带 _FEATURE_ID_0 构件编号，
+              extras["components"] 以构件编号为键，构件属性保存在批次节点的 extras["features"] 中
+    batch_vertex_limit: 合批时每个mesh的顶点数上限
+    quantize: 紧凑编码（KHR_mesh_quantization），坐标为相对mesh包围盒归一化的int16，
+              反量化变换放在节点矩阵上；法线为归一化int8；索引按顶点数使用uint8/uint16/uint32
+    compression: 几何压缩，None、"meshopt"（EXT_meshopt_compression，需要 meshoptimizer）
+                 或 "draco"（KHR_draco_mesh_compression，需要 DracoPy）；
+                 meshopt 压缩前会对索引做顶点缓存和overdraw重排，Draco 由编码器自行重排
+    draco_quantization_bits: Draco 坐标量化位数
+    property_sidecar: 构件属性写入同名的 .properties.sqlite 数据库（properties 表，以 global_id 为主键，
+                      properties 列为JSON），节点 extras 只保留 GlobalId，查看器可按需查询
+    cache_dir: 转换缓存目录，按 GlobalId + 几何/属性相关实体内容哈希 + 设置 缓存处理后的几何和属性，
+               再次导出同一模型的新版本时只三角化新增或修改过的构件
+    cache_max_bytes: 缓存目录大小上限，超出时按最近使用时间淘汰
+    global_ids, include_classes, exclude_classes, storeys: 三角化之前筛选构件，见 select_products
+    products: 已筛选好的构件列表，给出时忽略上面的筛选参数
+    relationship_index: 已建立的关系索引（见 index_relationships），同一模型多次导出时复用
+    verbose: 是否逐个构件打印处理结果（大模型上打印本身就有明显开销）
+    profile: 在输出文件旁写入 .profile.json 性能报告：各阶段用时（不含嵌套阶段）和次数、最慢的 profile_top 个构件、
+             峰值内存、按用途统计的buffer大小
+    lod_ratios: 自动LOD，如 (0.5, 0.2)，按比例用二次误差简化生成低精度索引（需要 meshoptimizer），
+                以 MSFT_lod 输出：LOD节点不放入场景，按 extras["MSFT_screencoverage"] 的屏幕覆盖率切换
+    ifc_file_path 也可以是已经打开的 ifcopenshell.file
+    gltf_file_path 为 None 时只三角化（并填充缓存）、计算包围盒，不生成任何输出文件
+    返回转换摘要：构件数、节点数、mesh数以及每个构件的世界坐标包围盒
     """
+    if batching and instancing:
+        raise ValueError("batching 与 instancing 不能同时使用")
+    if compression not in (None, "meshopt", "draco"):
+        raise ValueError(f"不支持的压缩方式: {compression}")
+    if compression == "meshopt" and meshoptimizer is None:
+        raise ImportError("meshopt 压缩需要安装 meshoptimizer: pip install meshoptimizer")
+    if lod_ratios and meshoptimizer is None:
+        raise ImportError("LOD 生成需要安装 meshoptimizer: pip install meshoptimizer")
+    if compression == "draco":
+        if DracoPy is None:
+            raise ImportError("Draco 压缩需要安装 DracoPy: pip install DracoPy")
+        if quantize:
+            raise ValueError("Draco 压缩自带量化，不能与 quantize 同时使用")
+    
+    # 没有输出路径时只计算包围盒
+    scan_only = gltf_file_path is None
+    
+    # 输出路径以 .glb 结尾时写单文件GLB，几何数据先写入同目录下的临时文件
+    glb = not scan_only and os.path.splitext(gltf_file_path)[1].lower() == ".glb"
+    
     # 创建 .bin 文件路径
-    bin_file_path = os.path.splitext(gltf_file_path)[0] + '.bin'
+    if scan_only:
+        bin_file_path = None
+    elif glb:
+        bin_file_path = gltf_file_path + ".bin.tmp"
+    else:
+        bin_file_path = os.path.splitext(gltf_file_path)[0] + '.bin'
     
-    # 检查文件是否存在
-    if not os.path.exists(ifc_file_path):
-        raise FileNotFoundError(f"IFC文件不存在: {ifc_file_path}")
+    # 各阶段累计用时和次数，阶段嵌套时（如 geometry 中的 normals）外层阶段不含内层用时，各阶段之和不重复计算
+    conversion_start = time.perf_counter()
+    stage_times = {}
+    stage_counts = {}
+    nested_times = []
     
-    # 检查文件大小
-    if os.path.getsize(ifc_file_path) == 0:
-        raise ValueError(f"IFC文件为空: {ifc_file_path}")
+    @contextlib.contextmanager
+    def timed(stage):
+        start = time.perf_counter()
+        nested_times.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stage_times[stage] = stage_times.get(stage, 0.0) + elapsed - nested_times.pop()
+            stage_counts[stage] = stage_counts.get(stage, 0) + 1
+            if nested_times:
+                nested_times[-1] += elapsed
+    
+    if isinstance(ifc_file_path, ifcopenshell.file):
+        # 已经打开的IFC文件（分块导出等场景），不再重复解析
+        ifc_file = ifc_file_path
+    else:
+        # 检查文件是否存在
+        if not os.path.exists(ifc_file_path):
+            raise FileNotFoundError(f"IFC文件不存在: {ifc_file_path}")
         
-    try:
-        # 加载IFC文件
-        print(f"正在加载IFC文件: {ifc_file_path}")
-        ifc_file = ifcopenshell.open(ifc_file_path)
-        print("IFC文件加载成功")
-    except Exception as e:
-        print(f"加载IFC文件时出错: {str(e)}")
-        print("请确保IFC文件格式正确且未损坏")
-        return
+        # 检查文件大小
+        if os.path.getsize(ifc_file_path) == 0:
+            raise ValueError(f"IFC文件为空: {ifc_file_path}")
+            
+        try:
+            # 加载IFC文件
+            print(f"正在加载IFC文件: {ifc_file_path}")
+            with timed("load"):
+                ifc_file = ifcopenshell.open(ifc_file_path)
+            print("IFC文件加载成功")
+        except Exception as e:
+            print(f"加载IFC文件时出错: {str(e)}")
+            print("请确保IFC文件格式正确且未损坏")
+            return
     
-    # 创建GLTF对象并添加扩展支持
-    gltf = GLTF2()
-    gltf.asset = Asset(version="2.0", generator="IfcOpenShell GLTF Exporter")
-    gltf.extensionsUsed = [
-        "KHR_materials_specular",
-        "KHR_materials_volume",
-        "FB_ngon_encoding"
-    ]
+    # glTF文档直接以字典和列表保存，各对象只包含需要输出的字段，最后由 write_gltf_json 流式写出
+    gltf = {
+        "asset": {"generator": "IfcOpenShell GLTF Exporter", "version": "2.0"},
+        "extensionsUsed": [
+            "KHR_materials_specular",
+            "KHR_materials_volume",
+            "FB_ngon_encoding"
+        ],
+        "extensionsRequired": [],
+        "accessors": gltf_accessor_table(),
+        "bufferViews": gltf_buffer_view_table(),
+        "buffers": [],
+        "materials": [],
+        "meshes": [],
+        "nodes": [],
+        "scenes": []
+    }
     
     # 设置IFC几何引擎的参数
     settings = ifcopenshell.geom.settings()
-    settings.set(settings.USE_WORLD_COORDS, True)
+    # 实例化模式使用局部坐标，构件位置由节点矩阵表达
+    settings.set(settings.USE_WORLD_COORDS, not instancing)
     
-    # 用于存储所有buffer数据
-    all_buffer_data = bytearray()
+    # 几何数据边处理边写入.bin文件，内存中只保留偏移量
+    bin_file = None
     current_buffer_length = 0
+    # meshopt压缩时，解压后数据所在的回退buffer长度（不实际写入）
+    fallback_buffer_length = 0
     
-    # 创建材质字典，用于重用相同材质
+    # 材质字典：按解析后的材质参数（而不是名称）去重，None 为没有表面样式时的默认材质
     material_dict = {}
     
-    def create_material_with_extensions(product):
-        """创建带扩展的材质"""
-        material_name = "DefaultMaterial"
-        if hasattr(product, "Material") and product.Material:
-            material_name = product.Material.Name
+    def create_material_with_extensions(style=None):
+        """
+        创建带扩展的材质，返回材质索引
+        style: resolve_style 解析出的材质参数，颜色、透明度、镜面反射颜色都相同的样式共用一个材质
+        """
+        if style is None:
+            key = None
+            material_name = "DefaultMaterial"
+            base_color = [0.125490203499794, 0.7921568751335144, 0.615686297416687, 1.0]
+            specular_color = None
+        else:
+            key = (tuple(style["color"]), tuple(style["specular"] or ()))
+            material_name = style["name"]
+            base_color = style["color"]
+            specular_color = style["specular"]
         
         # 检查是否已经创建过该材质
-        if material_name in material_dict:
-            return material_dict[material_name]
-        
-        # 创建新材质
-        material = Material(
-            name=material_name,
-            pbrMetallicRoughness={
-                "baseColorFactor": [0.125490203499794, 0.7921568751335144, 0.615686297416687, 1.0],
+        if key in material_dict:
+            return material_dict[key]
+        
+        # 创建带扩展的新材质
+        material = {
+            "extensions": {
+                "KHR_materials_specular": {
+                    "specularFactor": 1.0,
+                    "specularColorFactor": specular_color or [0.0004901961074210703, 0.0004901961074210703,
+                                                              0.0004901961074210703]
+                }
+            },
+            "pbrMetallicRoughness": {
+                "baseColorFactor": base_color,
                 "metallicFactor": 0.0,
                 "roughnessFactor": 0.9997508525848389
-            }
-        )
-        
-        # 添加材质扩展
-        material.extensions = {
-            "KHR_materials_specular": {
-                "specularFactor": 1.0,
-                "specularColorFactor": [0.0004901961074210703, 0.0004901961074210703, 0.0004901961074210703]
-            }
+            },
+            "emissiveFactor": [0.0, 0.0, 0.0],
+            "alphaMode": "BLEND" if base_color[3] < 1.0 else "OPAQUE",
+            "doubleSided": False,
+            "name": material_name
         }
         
-        material_dict[material_name] = len(gltf.materials)
-        gltf.materials.append(material)
-        return material_dict[material_name]
+        material_dict[key] = len(gltf["materials"])
+        gltf["materials"].append(material)
+        return material_dict[key]
+    
+    def material_parts(geometry):
+        """
+        按逐面材质编号把几何的索引拆分为 [(材质索引, 索引数组)]，每个材质一个primitive
+        参数相同的样式合并为同一部分，顺序为各材质在面中首次出现的顺序
+        """
+        indices = geometry["indices"]
+        materials = [create_material_with_extensions(style) for style in geometry["materials"]]
+        material_ids = geometry["material_ids"]
+        if not materials:
+            return [(create_material_with_extensions(), indices)]
+        # 法线计算丢弃过非法三角形时逐面编号无法对应，整个构件使用第一个材质
+        if (len(set(materials)) == 1 and (material_ids >= 0).all()) or len(material_ids) * 3 != len(indices):
+            return [(materials[0], indices)]
+        
+        if (material_ids < 0).any():
+            # 没有样式的面使用默认材质
+            materials.append(create_material_with_extensions())
+            material_ids = np.where(material_ids < 0, len(materials) - 1, material_ids)
+        face_materials = np.asarray(materials)[material_ids]
+        _, first_faces = np.unique(face_materials, return_index=True)
+        triangles = indices.reshape(-1, 3)
+        return [
+            (int(material), triangles[face_materials == material].ravel())
+            for material in face_materials[np.sort(first_faces)]
+        ]
     
-    def get_product_extras(product):
-        """获取产品的所有相关属性"""
+    # 关系索引只建立一次，属性集和类型属性解码后缓存
+    if relationship_index is None:
+        relationship_index = index_relationships(ifc_file)
+    pset_cache = {}
+    type_cache = {}
+    
+    def decode_property_set(property_set):
+        """解码属性集中的单值属性，按属性集id缓存"""
+        if property_set.id() not in pset_cache:
+            properties = {}
+            for prop in property_set.HasProperties:
+                if prop.is_a('IfcPropertySingleValue') and prop.NominalValue:
+                    properties[prop.Name] = str(prop.NominalValue.wrappedValue)
+            pset_cache[property_set.id()] = properties
+        return pset_cache[property_set.id()]
+    
+    def get_product_extras(product, shape=None):
+        """
+        获取产品的所有相关属性
+        shape: 主循环中已生成的几何结果，体积、面积、包围盒直接从中读取，避免重复三角化
+        """
         extras = {}
         
         # 获取所有直接属性
@@ -149,30 +1113,21 @@ def ifc_to_gltf(ifc_file_path, gltf_file_path):
         # 获取 Pset（属性集）中的属性
         def get_pset_properties(product):
             properties = {}
-            if hasattr(product, 'IsDefinedBy'):
-                for definition in product.IsDefinedBy:
-                    if definition.is_a('IfcRelDefinesByProperties'):
-                        property_set = definition.RelatingPropertyDefinition
-                        if property_set.is_a('IfcPropertySet'):
-                            for prop in property_set.HasProperties:
-                                if prop.is_a('IfcPropertySingleValue'):
-                                    if prop.NominalValue:
-                                        properties[prop.Name] = str(prop.NominalValue.wrappedValue)
+            for property_set in relationship_index["psets"].get(product.id(), []):
+                properties.update(decode_property_set(property_set))
             return properties
 
-        # 获取构件类型属性
+        # 获取构件类型属性（同一类型的所有实例共用缓存结果）
         def get_type_properties(product):
             properties = {}
-            if hasattr(product, 'IsTypedBy'):
-                for rel in product.IsTypedBy:
-                    if rel.is_a('IfcRelDefinesByType'):
-                        product_type = rel.RelatingType
-                        if hasattr(product_type, 'HasPropertySets'):
-                            for pset in product_type.HasPropertySets:
-                                if pset.is_a('IfcPropertySet'):
-                                    for prop in pset.HasProperties:
-                                        if prop.is_a('IfcPropertySingleValue') and prop.NominalValue:
-                                            properties[prop.Name] = str(prop.NominalValue.wrappedValue)
+            for product_type in relationship_index["types"].get(product.id(), []):
+                if product_type.id() not in type_cache:
+                    type_properties = {}
+                    for pset in getattr(product_type, "HasPropertySets", None) or []:
+                        if pset.is_a('IfcPropertySet'):
+                            type_properties.update(decode_property_set(pset))
+                    type_cache[product_type.id()] = type_properties
+                properties.update(type_cache[product_type.id()])
             return properties
 
         # 基本属性
@@ -188,21 +1143,15 @@ def ifc_to_gltf(ifc_file_path, gltf_file_path):
             extras["GlobalId"] = product.GlobalId
 
         # 获取材质信息
-        if hasattr(product, "HasAssociations"):
-            for association in product.HasAssociations:
-                if association.is_a("IfcRelAssociatesMaterial"):
-                    relating_material = association.RelatingMaterial
-                    if relating_material.is_a("IfcMaterial"):
-                        extras["Material"] = relating_material.Name
-                    elif relating_material.is_a("IfcMaterialList"):
-                        extras["Materials"] = [m.Name for m in relating_material.Materials]
+        for relating_material in relationship_index["materials"].get(product.id(), []):
+            if relating_material.is_a("IfcMaterial"):
+                extras["Material"] = relating_material.Name
+            elif relating_material.is_a("IfcMaterialList"):
+                extras["Materials"] = [m.Name for m in relating_material.Materials]
 
         # 几何属性
         if hasattr(product, "Representation"):
             try:
-                settings_volume = ifcopenshell.geom.settings()
-                settings_volume.set(settings_volume.USE_WORLD_COORDS, True)
-                shape = ifcopenshell.geom.create_shape(settings_volume, product)
                 if shape:
                     extras["Volume"] = str(round(shape.geometry.volume, 3))
                     extras["Areapertons"] = str(round(shape.geometry.area, 1))
@@ -214,6 +1163,9 @@ def ifc_to_gltf(ifc_file_path, gltf_file_path):
                             "Min": [round(v, 3) for v in bbox.min],
                             "Max": [round(v, 3) for v in bbox.max]
                         }
+                else:
+                    extras["Volume"] = "0"
+                    extras["Areapertons"] = "0"
             except:
                 extras["Volume"] = "0"
                 extras["Areapertons"] = "0"
@@ -237,6 +1189,7 @@ def ifc_to_gltf(ifc_file_path, gltf_file_path):
                             # 尝试获取实际高度
                             if hasattr(product, "Representation"):
                                 try:
+                                    # 与几何导出共用同一个 shape
                                     bbox = shape.geometry.bounding_box
                                     height = bbox.max[2] - bbox.min[2]
                                     extras["Topelevation"] = f"+{coords[2] + height:.3f}"
@@ -302,63 +1255,9 @@ def ifc_to_gltf(ifc_file_path, gltf_file_path):
         if hasattr(shape.geometry, 'normals') and len(shape.geometry.normals) > 0:
             normals = np.array(shape.geometry.normals).reshape(-1, 3)
         else:
-            # 如果没有法线或法线为空，计算法线
-            # 为每个顶点创建法线数组
-            normals = np.zeros_like(vertices)
-            if len(faces) > 0:  # 确保有面数据
-                # 创建一个临时数组来累积每个顶点的法线
-                vertex_normals = np.zeros_like(vertices)
-                vertex_counts = np.zeros(len(vertices), dtype=np.int32)
-                
-                # 遍历每个三角形
-                for i in range(0, len(faces), 3):
-                    if i + 2 < len(faces):  # 确保有足够的索引
-                        try:
-                            # 获取三角形的三个顶点
-                            v1_idx = faces[i]
-                            v2_idx = faces[i + 1]
-                            v3_idx = faces[i + 2]
-                            
-                            # 确保索引在有效范围内
-                            if max(v1_idx, v2_idx, v3_idx) < len(vertices):
-                                v1 = vertices[v1_idx]
-                                v2 = vertices[v2_idx]
-                                v3 = vertices[v3_idx]
-                                
-                                # 计算面法线
-                                normal = np.cross(v2 - v1, v3 - v1)
-                                norm = np.linalg.norm(normal)
-                                if norm > 0:  # 避免除以零
-                                    normal = normal / norm
-                                else:
-                                    normal = np.array([0.0, 1.0, 0.0])
-                                
-                                # 将法线添加到每个顶点
-                                vertex_normals[v1_idx] += normal
-                                vertex_normals[v2_idx] += normal
-                                vertex_normals[v3_idx] += normal
-                                vertex_counts[v1_idx] += 1
-                                vertex_counts[v2_idx] += 1
-                                vertex_counts[v3_idx] += 1
-                        except Exception as e:
-                            print(f"Warning: Error calculating normal for face {i//3}: {str(e)}")
-                            continue
-                
-                # 计算每个顶点的平均法线
-                for i in range(len(vertices)):
-                    if vertex_counts[i] > 0:
-                        normals[i] = vertex_normals[i] / vertex_counts[i]
-                        # 标准化法线
-                        norm = np.linalg.norm(normals[i])
-                        if norm > 0:
-                            normals[i] = normals[i] / norm
-                        else:
-                            normals[i] = np.array([0.0, 1.0, 0.0])
-                    else:
-                        normals[i] = np.array([0.0, 1.0, 0.0])
-            else:
-                # 如果没有面数据，所有法线默认向上
-                normals[:] = np.array([0.0, 1.0, 0.0])
+            # 如果没有法线或法线为空，批量计算法线
+            with timed("normals"):
+                vertices, normals, faces = compute_normals(vertices, faces, normal_mode, crease_angle)
         
         # 确保数据精度并检查数据有效性
         vertices = vertices.astype(np.float32)
@@ -375,172 +1274,1288 @@ def ifc_to_gltf(ifc_file_path, gltf_file_path):
         
         return vertices, normals, faces
     
+    def write_aligned(data):
+        """按4字节对齐写入.bin文件（支持任意buffer对象），返回写入位置"""
+        nonlocal current_buffer_length
+        padding = -current_buffer_length % 4
+        if padding:
+            bin_file.write(b"\x00" * padding)
+            current_buffer_length += padding
+        offset = current_buffer_length
+        bin_file.write(data)
+        current_buffer_length += memoryview(data).nbytes
+        return offset
+    
+    def add_meshopt_buffer_view(data, target, mode):
+        """
+        EXT_meshopt_compression：.bin中只写压缩数据，bufferView本身指向不含实际数据的回退buffer
+        mode 为 "ATTRIBUTES"（顶点属性）或 "TRIANGLES"（索引）
+        """
+        nonlocal fallback_buffer_length
+        count = len(data)
+        byte_stride = data.nbytes // count
+        if mode == "TRIANGLES":
+            encoded = meshoptimizer.encode_index_buffer(data.astype(np.uint32), count, int(data.max()) + 1)
+        else:
+            encoded = meshoptimizer.encode_vertex_buffer(data.view(np.uint8).reshape(count, -1), count, byte_stride)
+        
+        offset = write_aligned(encoded)
+        fallback_buffer_length += -fallback_buffer_length % 4
+        view_index = add_gltf_buffer_view(
+            gltf["bufferViews"],
+            1,
+            fallback_buffer_length,
+            data.nbytes,
+            byte_stride if mode == "ATTRIBUTES" else None,
+            target,
+            extensions={
+                "EXT_meshopt_compression": {
+                    "buffer": 0,
+                    "byteOffset": offset,
+                    "byteLength": len(encoded),
+                    "byteStride": byte_stride,
+                    "count": count,
+                    "mode": mode
+                }
+            }
+        )
+        fallback_buffer_length += data.nbytes
+        return view_index
+    
+    def add_buffer_view(data, target=None, byte_stride=None):
+        """将数组直接写入.bin文件（不经过 tobytes 复制）并创建bufferView，返回bufferView索引"""
+        data = np.ascontiguousarray(data)
+        if compression == "meshopt" and target in (34962, 34963) and len(data):
+            return add_meshopt_buffer_view(data, target, "ATTRIBUTES" if target == 34962 else "TRIANGLES")
+        # glTF要求bufferView起始位置按4字节对齐
+        offset = write_aligned(data.data)
+        return add_gltf_buffer_view(gltf["bufferViews"], 0, offset, data.nbytes, byte_stride, target)
+    
+    def add_mesh(vertices, normals, parts, feature_ids=None):
+        """
+        写入一个三角网格的顶点、法线、索引数据，返回mesh索引
+        parts: [(材质索引, 索引数组)]，每个材质一个primitive，各primitive共用顶点属性
+        feature_ids: 每个顶点的构件编号，写为 _FEATURE_ID_0 属性（EXT_mesh_features）
+        """
+        if compression == "meshopt":
+            # 压缩前先做顶点缓存/overdraw重排，顶点按使用顺序排列，压缩率更高
+            attributes = [normals] if feature_ids is None else [normals, feature_ids]
+            vertices, index_parts, attributes = optimize_mesh(vertices, [indices for _, indices in parts], attributes)
+            parts = [(material, indices) for (material, _), indices in zip(parts, index_parts)]
+            normals = attributes[0]
+            if feature_ids is not None:
+                feature_ids = attributes[1]
+        elif compression == "draco":
+            mesh_index = add_draco_mesh(vertices, normals, parts, feature_ids)
+            if lod_ratios:
+                # Draco 的顶点由编码器重排，每个LOD单独编码
+                mesh_lods[mesh_index] = [
+                    add_draco_mesh(vertices, normals, lod_parts, feature_ids)
+                    for lod_parts in simplify_part_lods(vertices, parts, lod_ratios)
+                ]
+            return mesh_index
+        
+        if quantize:
+            # 量化编码：int16坐标 + int8法线 + 最小索引类型，VEC3按4字节对齐补齐为4个分量
+            position_data, dequantization = quantize_positions(vertices)
+            normal_data = quantize_normals(normals)
+            vertex_view = add_buffer_view(position_data, 34962, 8)  # ARRAY_BUFFER
+            normal_view = add_buffer_view(normal_data, 34962, 4)  # ARRAY_BUFFER
+            
+            vertex_accessor = add_gltf_accessor(
+                gltf["accessors"],
+                5122,  # SHORT
+                len(vertices),
+                "VEC3",
+                vertex_view,
+                normalized=True,
+                max_value=convert_numpy_types(position_data[:, :3].max(axis=0)),
+                min_value=convert_numpy_types(position_data[:, :3].min(axis=0))
+            )
+            normal_accessor = add_gltf_accessor(gltf["accessors"], 5120, len(normals), "VEC3", normal_view,
+                                                normalized=True)  # BYTE
+            # 反量化变换在创建节点时合并到节点矩阵上
+            mesh_dequantization[len(gltf["meshes"])] = dequantization
+        else:
+            # 创建bufferViews
+            vertex_view = add_buffer_view(vertices, 34962)  # ARRAY_BUFFER
+            normal_view = add_buffer_view(normals, 34962)  # ARRAY_BUFFER
+            
+            # 创建accessors
+            vertex_accessor = add_gltf_accessor(
+                gltf["accessors"],
+                5126,  # FLOAT
+                len(vertices),
+                "VEC3",
+                vertex_view,
+                max_value=convert_numpy_types(vertices.max(axis=0)),
+                min_value=convert_numpy_types(vertices.min(axis=0))
+            )
+            normal_accessor = add_gltf_accessor(
+                gltf["accessors"],
+                5126,  # FLOAT
+                len(normals),
+                "VEC3",
+                normal_view,
+                max_value=convert_numpy_types(normals.max(axis=0)),
+                min_value=convert_numpy_types(normals.min(axis=0))
+            )
+        attributes = {
+            "POSITION": vertex_accessor,
+            "NORMAL": normal_accessor
+        }
+        index_accessors = add_index_accessors(parts)
+        extensions = {}
+        
+        if feature_ids is not None:
+            # glTF顶点属性不支持32位整数，构件编号以FLOAT存储（2^24以内精确）
+            feature_ids = feature_ids.astype(np.float32)
+            attributes["_FEATURE_ID_0"] = add_gltf_accessor(
+                gltf["accessors"],
+                5126,  # FLOAT
+                len(feature_ids),
+                "SCALAR",
+                add_buffer_view(feature_ids, 34962)  # ARRAY_BUFFER
+            )
+            extensions = {
+                "EXT_mesh_features": {
+                    "featureIds": [{
+                        "featureCount": int(len(np.unique(feature_ids))),
+                        "attribute": 0
+                    }]
+                }
+            }
+        
+        # 创建mesh，每个材质一个primitive
+        gltf["meshes"].append({"primitives": [
+            gltf_primitive(attributes, index_accessor, material, extensions)
+            for (material, _), index_accessor in zip(parts, index_accessors)
+        ]})
+        mesh_index = len(gltf["meshes"]) - 1
+        
+        if lod_ratios:
+            # 简化后的索引与原mesh共用顶点属性accessor，只新增索引
+            mesh_lods[mesh_index] = []
+            for lod_parts in simplify_part_lods(vertices, parts, lod_ratios):
+                gltf["meshes"].append({"primitives": [
+                    gltf_primitive(dict(attributes), index_accessor, material, extensions)
+                    for (material, _), index_accessor in zip(lod_parts, add_index_accessors(lod_parts))
+                ]})
+                mesh_lods[mesh_index].append(len(gltf["meshes"]) - 1)
+        return mesh_index
+    
+    def add_index_accessors(parts):
+        """依次写入各部分的索引数据，返回索引accessor的编号列表"""
+        return [add_index_accessor(indices) for _, indices in parts]
+    
+    def add_index_accessor(indices):
+        """写入索引数据并创建索引accessor，返回accessor索引"""
+        if quantize:
+            index_data, index_type = compact_indices(indices)
+            if compression == "meshopt" and index_type == 5121:
+                # meshopt索引压缩只支持16/32位索引
+                index_data, index_type = indices.astype(np.uint16), 5123
+        else:
+            index_data, index_type = indices, 5125  # UNSIGNED_INT
+        index_view = add_buffer_view(index_data, 34963)  # ELEMENT_ARRAY_BUFFER
+        return add_gltf_accessor(
+            gltf["accessors"],
+            index_type,
+            len(indices),
+            "SCALAR",
+            index_view,
+            max_value=[convert_numpy_types(indices.max())],
+            min_value=[convert_numpy_types(indices.min())]
+        )
+    
+    # 每个mesh的各级简化mesh索引
+    mesh_lods = {}
+    
+    def apply_lods():
+        """
+        MSFT_lod：为场景中引用了带简化级别mesh的节点创建LOD节点，LOD节点沿用原节点的矩阵和实例化属性，
+        不加入场景；屏幕覆盖率阈值逐级缩小为1/4，最低一级一直显示
+        """
+        for node in list(gltf["nodes"]):
+            lod_meshes = mesh_lods.get(node["mesh"])
+            if not lod_meshes:
+                continue
+            ids = []
+            for level, lod_mesh in enumerate(lod_meshes, 1):
+                lod_node = gltf_node(lod_mesh, f"{node['name']}_LOD{level}", extensions=dict(node["extensions"]))
+                lod_node["matrix"] = node["matrix"]
+                gltf["nodes"].append(lod_node)
+                ids.append(len(gltf["nodes"]) - 1)
+            node["extensions"] = dict(node["extensions"], MSFT_lod={"ids": ids})
+            node["extras"] = dict(node["extras"] or {},
+                                  MSFT_screencoverage=[0.2 * 0.25 ** level for level in range(len(ids))] + [0.0])
+        if any(mesh_lods.values()):
+            gltf["extensionsUsed"].append("MSFT_lod")
+    
+    def add_draco_mesh(vertices, normals, parts, feature_ids=None):
+        """
+        KHR_draco_mesh_compression：每个材质的primitive分别压缩，多个材质时每部分只保留自己引用的顶点
+        返回mesh索引
+        """
+        primitives = []
+        for material, indices in parts:
+            part_vertices, part_normals, part_feature_ids = vertices, normals, feature_ids
+            if len(parts) > 1:
+                attributes = [normals] if feature_ids is None else [normals, feature_ids]
+                part_vertices, indices, attributes = extract_submesh(vertices, indices, attributes)
+                part_normals = attributes[0]
+                if feature_ids is not None:
+                    part_feature_ids = attributes[1]
+            primitives.append(add_draco_primitive(part_vertices, part_normals, indices, material, part_feature_ids))
+        gltf["meshes"].append({"primitives": primitives})
+        return len(gltf["meshes"]) - 1
+    
+    def add_draco_primitive(vertices, normals, indices, material, feature_ids=None):
+        """
+        顶点、法线、索引整体压缩为一个bufferView，
+        Draco会自行重排和去重顶点，accessor的数量和范围以解码结果为准
+        """
+        triangles = indices[:len(indices) - len(indices) % 3].reshape(-1, 3)
+        generic_attributes = None
+        if feature_ids is not None:
+            generic_attributes = {"_FEATURE_ID_0": feature_ids.astype(np.float32).reshape(-1, 1)}
+        encoded = DracoPy.encode(
+            vertices.astype(np.float64), triangles,
+            quantization_bits=draco_quantization_bits,
+            compression_level=7,
+            normals=normals.astype(np.float64),
+            normal_quantization_bits=10,
+            generic_attributes=generic_attributes
+        )
+        decoded = DracoPy.decode(encoded)
+        points = np.asarray(decoded.points, dtype=np.float32)
+        
+        draco_view = add_buffer_view(np.frombuffer(encoded, dtype=np.uint8))
+        attributes = {
+            "POSITION": add_gltf_accessor(
+                gltf["accessors"],
+                5126,  # FLOAT
+                len(points),
+                "VEC3",
+                max_value=convert_numpy_types(points.max(axis=0)),
+                min_value=convert_numpy_types(points.min(axis=0))
+            ),
+            "NORMAL": add_gltf_accessor(gltf["accessors"], 5126, len(points), "VEC3")
+        }
+        indices_accessor = add_gltf_accessor(gltf["accessors"], 5125, int(np.asarray(decoded.faces).size), "SCALAR")
+        draco_attributes = {
+            "POSITION": decoded.get_attribute_by_type(DracoPy.AttributeType.POSITION)["unique_id"],
+            "NORMAL": decoded.get_attribute_by_type(DracoPy.AttributeType.NORMAL)["unique_id"]
+        }
+        extensions = {}
+        if feature_ids is not None:
+            attributes["_FEATURE_ID_0"] = add_gltf_accessor(gltf["accessors"], 5126, len(points), "SCALAR")
+            draco_attributes["_FEATURE_ID_0"] = decoded.get_attribute_by_name("_FEATURE_ID_0")["unique_id"]
+            extensions["EXT_mesh_features"] = {
+                "featureIds": [{"featureCount": int(len(np.unique(feature_ids))), "attribute": 0}]
+            }
+        extensions["KHR_draco_mesh_compression"] = {
+            "bufferView": draco_view,
+            "attributes": draco_attributes
+        }
+        
+        return gltf_primitive(attributes, indices_accessor, material, extensions)
+    
+    # 量化模式下每个mesh的反量化矩阵
+    mesh_dequantization = {}
+    
+    def apply_dequantization(node):
+        """把mesh的反量化变换合并到节点矩阵（节点变换 * 反量化）"""
+        if node["mesh"] in mesh_dequantization:
+            matrix = node["matrix"] if node["matrix"] else np.eye(4).ravel()
+            node["matrix"] = convert_numpy_types(multiply_matrices(matrix, mesh_dequantization[node["mesh"]]))
+        return node
+    
+    # 实例化模式下已写入的mesh：几何id和内容哈希都映射到mesh索引
+    mesh_cache = {}
+    
+    def get_instanced_mesh(geometry_id, vertices, normals, parts):
+        """
+        相同表示（几何id相同）或内容完全相同的几何只写入一次
+        缓存读取的几何没有几何id（None），只按内容去重
+        """
+        materials = tuple(material for material, _ in parts)
+        representation_key = ("representation", geometry_id, materials)
+        if geometry_id is not None and representation_key in mesh_cache:
+            return mesh_cache[representation_key]
+        
+        digest = hashlib.blake2b(digest_size=16)
+        for array in [vertices, normals] + [indices for _, indices in parts]:
+            digest.update(np.ascontiguousarray(array).data)
+        content_key = ("content", digest.hexdigest(), materials)
+        if content_key not in mesh_cache:
+            mesh_cache[content_key] = add_mesh(vertices, normals, parts)
+        if geometry_id is not None:
+            mesh_cache[representation_key] = mesh_cache[content_key]
+        return mesh_cache[content_key]
+    
+    def add_accessor(array, accessor_type, component_type=5126):
+        """为实例属性等非顶点数据创建accessor，返回accessor索引"""
+        return add_gltf_accessor(gltf["accessors"], component_type, len(array), accessor_type, add_buffer_view(array))
+    
+    def apply_gpu_instancing():
+        """
+        将引用同一mesh的多个节点合并为一个 EXT_mesh_gpu_instancing 节点
+        构件信息的键为 "节点索引:实例索引"，每个实例的属性保存在节点 extras["instances"] 中
+        无法分解为平移/旋转/缩放的矩阵（如存在剪切）保留为普通节点
+        """
+        nodes = gltf["nodes"]
+        infos = [component_info[str(i)] for i in range(len(nodes))]
+        groups = {}
+        for i, node in enumerate(nodes):
+            groups.setdefault(node["mesh"], []).append(i)
+        
+        gltf["nodes"] = []
+        component_info.clear()
+        instancing_nodes = 0
+        for mesh_index, members in groups.items():
+            translations, rotations, scales, valid = matrices_to_trs(
+                [nodes[i]["matrix"] or np.eye(4).flatten() for i in members]
+            )
+            instanced = [i for i, ok in zip(members, valid) if ok]
+            if len(instanced) < 2:
+                instanced = []
+            
+            for i in members:
+                if i not in instanced:
+                    gltf["nodes"].append(nodes[i])
+                    component_info[str(len(gltf["nodes"]) - 1)] = infos[i]
+            if not instanced:
+                continue
+            
+            rows = [members.index(i) for i in instanced]
+            node = gltf_node(
+                mesh_index,
+                f"Instances_{mesh_index}",
+                extensions={
+                    "EXT_mesh_gpu_instancing": {
+                        "attributes": {
+                            "TRANSLATION": add_accessor(translations[rows], "VEC3"),
+                            "ROTATION": add_accessor(rotations[rows], "VEC4"),
+                            "SCALE": add_accessor(scales[rows], "VEC3")
+                        }
+                    }
+                },
+                extras={"instances": [nodes[i]["extras"] for i in instanced]}
+            )
+            gltf["nodes"].append(node)
+            instancing_nodes += 1
+            for instance_index, i in enumerate(instanced):
+                component_info[f"{len(gltf['nodes']) - 1}:{instance_index}"] = infos[i]
+        
+        # 没有生成实例化节点时不声明扩展
+        if instancing_nodes and "EXT_mesh_gpu_instancing" not in gltf["extensionsUsed"]:
+            gltf["extensionsUsed"].append("EXT_mesh_gpu_instancing")
+    
+    # 合批模式下按材质累积、尚未写出的几何
+    pending_batches = {}
+    
+    def flush_batch(material):
+        """把某个材质累积的几何合并成一个mesh并创建对应节点"""
+        batch = pending_batches.pop(material, None)
+        if not batch or not batch["vertices"]:
+            return
+        # 各构件的索引加上在合并顶点数组中的起始偏移
+        offsets = np.cumsum([0] + [len(v) for v in batch["vertices"][:-1]])
+        indices = np.concatenate([
+            faces + np.uint32(offset) for faces, offset in zip(batch["indices"], offsets)
+        ])
+        feature_ids = np.concatenate([
+            np.full(len(v), feature_id) for v, feature_id in zip(batch["vertices"], batch["feature_ids"])
+        ])
+        mesh_index = add_mesh(
+            np.concatenate(batch["vertices"]),
+            np.concatenate(batch["normals"]),
+            [(material, indices)],
+            feature_ids
+        )
+        gltf["nodes"].append(apply_dequantization(gltf_node(
+            mesh_index,
+            f"Batch_{len(gltf['nodes'])}",
+            extras={"features": batch["extras"]}
+        )))
+    
+    def add_to_batch(material, feature_id, vertices, normals, indices, extras):
+        """按材质合批，超过顶点上限时先写出当前批次；单个构件超过上限时独占一个批次"""
+        batch = pending_batches.get(material)
+        if batch and batch["vertex_count"] + len(vertices) > batch_vertex_limit:
+            flush_batch(material)
+            batch = None
+        if batch is None:
+            batch = pending_batches[material] = {
+                "vertices": [], "normals": [], "indices": [], "feature_ids": [],
+                "extras": {}, "vertex_count": 0
+            }
+        batch["vertices"].append(vertices)
+        batch["normals"].append(normals)
+        batch["indices"].append(indices)
+        batch["feature_ids"].append(feature_id)
+        batch["extras"][str(feature_id)] = extras
+        batch["vertex_count"] += len(vertices)
+    
+    # 属性旁路数据库：构件属性写入SQLite，节点只保留GlobalId
+    property_db = None
+    property_db_path = None if scan_only else os.path.splitext(gltf_file_path)[0] + '.properties.sqlite'
+    pending_properties = []
+    
+    def flush_properties():
+        property_db.executemany(
+            "INSERT OR REPLACE INTO properties (global_id, ifc_type, name, properties) VALUES (?, ?, ?, ?)",
+            pending_properties
+        )
+        pending_properties.clear()
+    
+    def collect_extras(product, extras):
+        """输出构件属性；启用属性数据库时写入数据库，返回只含GlobalId的extras"""
+        if property_db is None:
+            return extras
+        pending_properties.append((
+            product.GlobalId,
+            product.is_a(),
+            product.Name if hasattr(product, "Name") else None,
+            json.dumps(extras, ensure_ascii=False, default=convert_numpy_types)
+        ))
+        if len(pending_properties) >= 1000:
+            flush_properties()
+        return {"GlobalId": product.GlobalId}
+    
+    if property_sidecar:
+        if os.path.exists(property_db_path):
+            os.remove(property_db_path)
+        property_db = sqlite3.connect(property_db_path)
+        property_db.execute(
+            "CREATE TABLE properties ("
+            "global_id TEXT PRIMARY KEY, ifc_type TEXT, name TEXT, properties TEXT)"
+        )
+    
     # 用于存储构件信息的扩展
     component_info = {}
     
-    # 遍历IFC文件中的所有产品
-    for product in ifc_file.by_type("IfcProduct"):
-        if not product.Representation:
-            continue
-
-        try:
-            # 处理形状
-            shape = ifcopenshell.geom.create_shape(settings, product)
+    # 缓存键包含影响几何处理结果的设置，设置变化时缓存自动失效
+    settings_key = f"3|{ifcopenshell.version}|{instancing}|{normal_mode}|{crease_angle}"
+    
+    def product_cache_key(product):
+        """GlobalId + 几何和属性相关实体（含开洞）的内容哈希 + 设置"""
+        roots = [product]
+        for name in ("psets", "types", "materials", "openings"):
+            roots.extend(relationship_index[name].get(product.id(), []))
+        content = hash_entity_graph(roots, relationship_index["styles"])
+        return hashlib.blake2b(f"{product.GlobalId}|{content}|{settings_key}".encode("utf-8"),
+                               digest_size=20).hexdigest()
+    
+    def iter_product_geometry(products):
+        """
+        按顺序产出 (product, geometry)，geometry 包含处理后的顶点/法线/索引、几何id、变换矩阵和构件属性
+        启用缓存时命中的构件直接读取缓存，只有新增或修改过的构件才会三角化
+        """
+        keys = {}
+        misses = products
+        if cache_dir:
+            with timed("cache_lookup"):
+                keys = {product.id(): product_cache_key(product) for product in products}
+                misses = [p for p in products if not os.path.exists(cache_entry_path(cache_dir, keys[p.id()]))]
+            print(f"缓存命中: {len(products) - len(misses)}/{len(products)} 个构件")
+        
+        missed_ids = {product.id() for product in misses}
+        shapes = iter_product_shapes(ifc_file, settings, misses, num_threads)
+        for product in products:
+            if product.id() in missed_ids:
+                with timed("tessellation"):
+                    _, shape = next(shapes)
+            else:
+                with timed("cache_load"):
+                    geometry = load_cached_geometry(cache_dir, keys[product.id()])
+                if geometry is not None:
+                    yield product, geometry
+                    continue
+                # 检查之后缓存条目被其他进程淘汰，单独三角化
+                with timed("tessellation"):
+                    _, shape = next(iter_product_shapes(ifc_file, settings, [product]))
             
-            if shape:
-                # 处理几何数据
-                vertices, normals, indices = process_geometry(shape)
-                
-                # 创建buffer数据
-                vertex_data = vertices.tobytes()
-                normal_data = normals.tobytes()
-                index_data = indices.tobytes()
-                
-                # 添加到总buffer
-                vertex_offset = current_buffer_length
-                all_buffer_data.extend(vertex_data)
-                current_buffer_length += len(vertex_data)
-                
-                normal_offset = current_buffer_length
-                all_buffer_data.extend(normal_data)
-                current_buffer_length += len(normal_data)
-                
-                index_offset = current_buffer_length
-                all_buffer_data.extend(index_data)
-                current_buffer_length += len(index_data)
-                
-                # 创建bufferViews
-                vertex_buffer_view = BufferView(
-                    buffer=0,
-                    byteOffset=vertex_offset,
-                    byteLength=len(vertex_data),
-                    target=34962  # ARRAY_BUFFER
-                )
-                normal_buffer_view = BufferView(
-                    buffer=0,
-                    byteOffset=normal_offset,
-                    byteLength=len(normal_data),
-                    target=34962  # ARRAY_BUFFER
-                )
-                index_buffer_view = BufferView(
-                    buffer=0,
-                    byteOffset=index_offset,
-                    byteLength=len(index_data),
-                    target=34963  # ELEMENT_ARRAY_BUFFER
-                )
-                gltf.bufferViews.extend([vertex_buffer_view, normal_buffer_view, index_buffer_view])
-                
-                # 创建accessors
-                vertex_accessor = Accessor(
-                    bufferView=len(gltf.bufferViews) - 3,
-                    componentType=5126,  # FLOAT
-                    count=len(vertices),
-                    type="VEC3",
-                    max=convert_numpy_types(vertices.max(axis=0)),
-                    min=convert_numpy_types(vertices.min(axis=0))
-                )
-                normal_accessor = Accessor(
-                    bufferView=len(gltf.bufferViews) - 2,
-                    componentType=5126,  # FLOAT
-                    count=len(normals),
-                    type="VEC3",
-                    max=convert_numpy_types(normals.max(axis=0)),
-                    min=convert_numpy_types(normals.min(axis=0))
-                )
-                index_accessor = Accessor(
-                    bufferView=len(gltf.bufferViews) - 1,
-                    componentType=5125,  # UNSIGNED_INT
-                    count=len(indices),
-                    type="SCALAR",
-                    max=[convert_numpy_types(indices.max())],
-                    min=[convert_numpy_types(indices.min())]
-                )
-                gltf.accessors.extend([vertex_accessor, normal_accessor, index_accessor])
-                
-                # 创建primitive
-                primitive = Primitive(
-                    attributes={
-                        "POSITION": len(gltf.accessors) - 3,
-                        "NORMAL": len(gltf.accessors) - 2
-                    },
-                    indices=len(gltf.accessors) - 1,
-                    material=create_material_with_extensions(product)
-                )
-                
-                # 创建mesh
-                mesh = Mesh(primitives=[primitive])
-                gltf.meshes.append(mesh)
-                
-                # 创建node
-                node = Node(
-                    mesh=len(gltf.meshes) - 1,
-                    name=f"{product.is_a()}_{product.GlobalId}"
-                )
-                
-                # 添加变换矩阵（如果有）
-                if hasattr(product, "ObjectPlacement"):
-                    try:
-                        matrix = convert_numpy_types(shape.transformation.matrix.flatten())
-                        node.matrix = matrix
-                    except:
-                        pass
-                
-                # 添加额外信息
-                node.extras = get_product_extras(product)
-                
-                gltf.nodes.append(node)
-                
-                # 存储构件信息
-                component_info[str(len(gltf.nodes) - 1)] = {
-                    "globalId": product.GlobalId,
-                    "type": product.is_a(),
-                    "name": product.Name if hasattr(product, "Name") else None
-                }
-                
-                print(f"成功: 已处理 {product.is_a()} (GlobalId: {product.GlobalId})")
-                
-        except RuntimeError as e:
-            print(f"警告: 处理产品 {product.is_a()} (GlobalId: {product.GlobalId}) 时出错: {str(e)}")
-            continue
+            if not shape:
+                continue
+            with timed("geometry"):
+                try:
+                    vertices, normals, indices = process_geometry(shape)
+                except ValueError as e:
+                    print(f"警告: 处理产品 {product.is_a()} (GlobalId: {product.GlobalId}) 时出错: {str(e)}")
+                    continue
+                material_ids = np.array(shape.geometry.material_ids, dtype=np.int32)
+                materials = [resolve_style(style) for style in shape.geometry.materials]
+            with timed("extras"):
+                extras = get_product_extras(product, shape)
+            geometry = {
+                "vertices": vertices,
+                "normals": normals,
+                "indices": indices,
+                "material_ids": material_ids,
+                "materials": materials,
+                "matrix": np.array(shape.transformation.matrix, dtype=np.float64).ravel(),
+                "geometry_id": str(shape.geometry.id),
+                "extras": extras
+            }
+            if cache_dir:
+                with timed("cache_store"):
+                    store_cached_geometry(cache_dir, keys[product.id()], geometry)
+            yield product, geometry
     
-    # 将几何数据写入.bin文件
-    with open(bin_file_path, 'wb') as f:
-        f.write(all_buffer_data)
+    # 遍历筛选后的产品，几何数据直接写入.bin文件
+    if products is None:
+        with timed("select"):
+            products = select_products(ifc_file, include_classes, exclude_classes, storeys, global_ids)
     
-    # 创建指向外部.bin文件的buffer
-    buffer = Buffer(
-        byteLength=len(all_buffer_data),
-        uri=os.path.basename(bin_file_path)  # 使用相对路径
+    # 每个构件的世界坐标包围盒，随转换结果返回
+    bounding_boxes = {}
+    # 每个构件的 (用时, GlobalId, 类型, 三角形数)，用时从取得上一个构件结果开始计算（含三角化）
+    product_times = []
+    product_start = time.perf_counter()
+    # GLB的几何数据先写入临时文件，转换中途出错时同样删除
+    try:
+        with (contextlib.nullcontext() if scan_only else open(bin_file_path, 'wb')) as bin_file:
+            for product, geometry in iter_product_geometry(products):
+                try:
+                    if geometry:
+                        # 处理几何数据
+                        vertices, normals = geometry["vertices"], geometry["normals"]
+                        if len(vertices):
+                            bounding_boxes[product.GlobalId] = world_bounding_box(
+                                vertices, geometry["matrix"] if instancing else None
+                            )
+                        if scan_only:
+                            continue
+                        parts = material_parts(geometry)
+                        
+                        # 构件信息
+                        info = {
+                            "globalId": product.GlobalId,
+                            "type": product.is_a(),
+                            "name": product.Name if hasattr(product, "Name") else None
+                        }
+                        
+                        if batching:
+                            # 合批模式以构件编号（_FEATURE_ID_0 的值）作为构件信息的键
+                            feature_id = len(component_info)
+                            with timed("properties"):
+                                extras = collect_extras(product, geometry["extras"])
+                            with timed("mesh"):
+                                # 按材质合批，多材质构件的各部分只带自己引用的顶点进入对应批次
+                                for material, indices in parts:
+                                    part_vertices, part_normals = vertices, normals
+                                    if len(parts) > 1:
+                                        part_vertices, indices, (part_normals,) = extract_submesh(vertices, indices, [normals])
+                                    add_to_batch(material, feature_id, part_vertices, part_normals, indices, extras)
+                            component_info[str(feature_id)] = info
+                            if verbose:
+                                print(f"成功: 已处理 {product.is_a()} (GlobalId: {product.GlobalId})")
+                            continue
+                        
+                        with timed("mesh"):
+                            if instancing:
+                                mesh_index = get_instanced_mesh(geometry["geometry_id"], vertices, normals, parts)
+                            else:
+                                mesh_index = add_mesh(vertices, normals, parts)
+                        
+                        # 创建node
+                        node = gltf_node(mesh_index, f"{product.is_a()}_{product.GlobalId}")
+                        
+                        # 添加变换矩阵：世界坐标几何不需要节点矩阵
+                        if instancing:
+                            # 局部坐标几何，变换矩阵（列主序，与glTF一致）放到节点上
+                            matrix = geometry["matrix"]
+                            if not np.allclose(matrix, np.eye(4).ravel()):
+                                node["matrix"] = convert_numpy_types(matrix)
+                        
+                        apply_dequantization(node)
+                        
+                        # 添加额外信息
+                        with timed("properties"):
+                            node["extras"] = collect_extras(product, geometry["extras"])
+                        
+                        gltf["nodes"].append(node)
+                        
+                        # 存储构件信息
+                        component_info[str(len(gltf["nodes"]) - 1)] = info
+                        
+                        if verbose:
+                            print(f"成功: 已处理 {product.is_a()} (GlobalId: {product.GlobalId})")
+                        
+                except RuntimeError as e:
+                    print(f"警告: 处理产品 {product.is_a()} (GlobalId: {product.GlobalId}) 时出错: {str(e)}")
+                    continue
+                finally:
+                    now = time.perf_counter()
+                    if geometry:
+                        product_times.append((now - product_start, product.GlobalId, product.is_a(),
+                                              len(geometry["indices"]) // 3))
+                    product_start = now
+            
+            if scan_only:
+                if cache_dir:
+                    evict_cache(cache_dir, cache_max_bytes)
+                return {"products": len(bounding_boxes), "nodes": 0, "meshes": 0, "bounding_boxes": bounding_boxes}
+            
+            if instancing and gpu_instancing:
+                with timed("gpu_instancing"):
+                    apply_gpu_instancing()
+            
+            if batching:
+                with timed("mesh"):
+                    for material in list(pending_batches):
+                        flush_batch(material)
+                if gltf["meshes"]:
+                    gltf["extensionsUsed"].append("EXT_mesh_features")
+        
+        # LOD节点不放入场景
+        scene_node_count = len(gltf["nodes"])
+        if lod_ratios:
+            with timed("lod"):
+                apply_lods()
+        
+        if cache_dir:
+            evict_cache(cache_dir, cache_max_bytes)
+        
+        if quantize and gltf["meshes"]:
+            gltf["extensionsUsed"].append("KHR_mesh_quantization")
+            gltf["extensionsRequired"].append("KHR_mesh_quantization")
+        
+        if compression == "meshopt" and fallback_buffer_length:
+            gltf["extensionsUsed"].append("EXT_meshopt_compression")
+            gltf["extensionsRequired"].append("EXT_meshopt_compression")
+        elif compression == "draco" and gltf["meshes"]:
+            gltf["extensionsUsed"].append("KHR_draco_mesh_compression")
+            gltf["extensionsRequired"].append("KHR_draco_mesh_compression")
+        
+        # 创建指向外部.bin文件的buffer，GLB内嵌的buffer不需要uri
+        if glb:
+            buffer = {"byteLength": current_buffer_length}
+        else:
+            buffer = {
+                "uri": os.path.basename(bin_file_path),  # 使用相对路径
+                "byteLength": current_buffer_length
+            }
+        gltf["buffers"].append(buffer)
+        
+        if fallback_buffer_length:
+            # meshopt回退buffer：没有uri，解码器按bufferView扩展信息从buffer 0解压
+            gltf["buffers"].append({
+                "extensions": {"EXT_meshopt_compression": {"fallback": True}},
+                "byteLength": fallback_buffer_length
+            })
+        
+        # 创建scene
+        gltf["scenes"].append({"nodes": list(range(scene_node_count))})
+        gltf["scene"] = 0
+        
+        # 添加扩展信息
+        gltf["extras"] = {
+            "components": component_info
+        }
+        
+        if property_db is not None:
+            flush_properties()
+            property_db.commit()
+            property_db.close()
+            # 告诉查看器到哪里按GlobalId查询属性
+            gltf["extras"]["properties"] = {
+                "uri": os.path.basename(property_db_path),
+                "format": "sqlite",
+                "table": "properties",
+                "key": "global_id"
+            }
+            print(f"构件属性已保存为: {property_db_path}")
+        
+        # 转换结果摘要
+        summary = {
+            "products": len(component_info),
+            "nodes": len(gltf["nodes"]),
+            "meshes": len(gltf["meshes"]),
+            "bounding_boxes": bounding_boxes
+        }
+        
+        with timed("save"):
+            if glb:
+                write_glb(gltf, gltf_file_path, bin_file_path, current_buffer_length)
+            else:
+                # .gltf文件沿用此前 pygltflib 保存时写入的asset信息，保证输出不变
+                gltf["asset"] = {"generator": Asset().generator, "version": "2.0"}
+                with open(gltf_file_path, "w") as f:
+                    write_gltf_json(gltf, f)
+    finally:
+        if glb and os.path.exists(bin_file_path):
+            os.remove(bin_file_path)
+    print(f"转换完成！")
+    if glb:
+        print(f"GLB文件已保存为: {gltf_file_path}")
+    else:
+        print(f"GLTF文件已保存为: {gltf_file_path}")
+        print(f"几何数据已保存为: {bin_file_path}")
+    
+    if profile:
+        report = {
+            "source": None if isinstance(ifc_file_path, ifcopenshell.file) else ifc_file_path,
+            "output": gltf_file_path,
+            "seconds": round(time.perf_counter() - conversion_start, 6),
+            "stages": {
+                stage: {"seconds": round(seconds, 6), "count": stage_counts[stage]}
+                for stage, seconds in sorted(stage_times.items(), key=lambda item: -item[1])
+            },
+            "products": {
+                "selected": len(products),
+                "exported": len(product_times),
+                "triangles": sum(entry[3] for entry in product_times)
+            },
+            "slowest_products": [
+                {"globalId": global_id, "type": ifc_class, "triangles": triangles, "seconds": round(seconds, 6)}
+                for seconds, global_id, ifc_class, triangles in heapq.nlargest(profile_top, product_times)
+            ],
+            "peak_memory_bytes": peak_memory_bytes(),
+            "buffers": buffer_usage(gltf),
+            "files": {
+                path: os.path.getsize(path)
+                for path in [gltf_file_path] + ([] if glb else [bin_file_path])
+                + ([property_db_path] if property_db is not None else [])
+            }
+        }
+        profile_path = os.path.splitext(gltf_file_path)[0] + ".profile.json"
+        with open(profile_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"性能报告已保存为: {profile_path}")
+    return summary
+
+def get_storey(product):
+    """沿空间包含和聚合关系向上查找构件所在的楼层，找不到返回 None"""
+    element = product
+    while element is not None:
+        if element.is_a("IfcBuildingStorey"):
+            return element
+        element = (ifcopenshell.util.element.get_container(element)
+                   or ifcopenshell.util.element.get_aggregate(element))
+    return None
+
+def merge_bounding_boxes(boxes):
+    boxes = np.asarray(boxes, dtype=np.float64)
+    return boxes[:, 0].min(axis=0), boxes[:, 1].max(axis=0)
+
+def partition_octree(bounding_boxes, max_tile_products=2000, max_depth=10):
+    """
+    按构件包围盒中心递归八叉树划分，每个叶子最多 max_tile_products 个构件
+    返回树节点 {"bounds": (min, max), "global_ids": [...], "children": [...]}，只有叶子带 global_ids
+    """
+    def build(global_ids, depth):
+        bounds = merge_bounding_boxes([bounding_boxes[g] for g in global_ids])
+        if len(global_ids) <= max_tile_products or depth >= max_depth:
+            return {"bounds": bounds, "global_ids": global_ids, "children": []}
+        
+        centers = np.array([np.add(*bounding_boxes[g]) / 2 for g in global_ids])
+        split = (bounds[0] + bounds[1]) / 2
+        octants = ((centers > split) * [1, 2, 4]).sum(axis=1)
+        if len(np.unique(octants)) == 1:
+            # 中心点重合无法继续划分
+            return {"bounds": bounds, "global_ids": global_ids, "children": []}
+        
+        children = []
+        for octant in range(8):
+            members = [g for g, o in zip(global_ids, octants) if o == octant]
+            if members:
+                children.append(build(members, depth + 1))
+        return {"bounds": bounds, "global_ids": [], "children": children}
+    
+    return build(list(bounding_boxes), 0)
+
+def partition_by_storey(ifc_file, bounding_boxes):
+    """按 IfcBuildingStorey 划分，每个楼层一个叶子，不属于任何楼层的构件单独成一块"""
+    groups = {}
+    for global_id in bounding_boxes:
+        storey = get_storey(ifc_file.by_guid(global_id))
+        groups.setdefault(storey.GlobalId if storey else None, []).append(global_id)
+    
+    children = [
+        {"bounds": merge_bounding_boxes([bounding_boxes[g] for g in members]), "global_ids": members, "children": []}
+        for members in groups.values()
+    ]
+    return {
+        "bounds": merge_bounding_boxes([child["bounds"] for child in children]),
+        "global_ids": [],
+        "children": children
+    }
+
+def ifc_to_3dtiles(ifc_file_path, output_dir, tile_by="octree", max_tile_products=2000,
+                   cache_dir=None, **options):
+    """
+    分块输出：按八叉树（tile_by="octree"）或楼层（tile_by="storey"）划分构件，
+    每块输出一个GLB，并生成 3D Tiles 1.1 的 tileset.json（包围盒 + 几何误差），查看器可按视野流式加载和剔除
+    先只三角化一遍得到每个构件的包围盒（不生成输出），同时填充转换缓存，各分块直接从缓存读取几何，不重复三角化；
+    关系索引和构件筛选只做一次，各分块共用
+    options: 传给 ifc_to_gltf 的其他参数（batching、quantize、compression 等）
+    """
+    if tile_by not in ("octree", "storey"):
+        raise ValueError(f"不支持的分块方式: {tile_by}")
+    
+    print(f"正在加载IFC文件: {ifc_file_path}")
+    ifc_file = ifcopenshell.open(ifc_file_path)
+    tiles_dir = os.path.join(output_dir, "tiles")
+    os.makedirs(tiles_dir, exist_ok=True)
+    
+    relationship_index = index_relationships(ifc_file)
+    products = select_products(
+        ifc_file,
+        *(options.pop(name, None) for name in ("include_classes", "exclude_classes", "storeys", "global_ids"))
     )
-    gltf.buffers.append(buffer)
     
-    # 创建scene
-    scene = Scene(nodes=list(range(len(gltf.nodes))))
-    gltf.scenes.append(scene)
-    gltf.scene = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = cache_dir or os.path.join(temp_dir, "cache")
+        summary = ifc_to_gltf(ifc_file, None, cache_dir=cache_dir, products=products,
+                              relationship_index=relationship_index, **options)
+        bounding_boxes = summary["bounding_boxes"]
+        if not bounding_boxes:
+            raise ValueError("没有可导出的构件")
+        
+        if tile_by == "storey":
+            tree = partition_by_storey(ifc_file, bounding_boxes)
+        else:
+            tree = partition_octree(bounding_boxes, max_tile_products)
+        
+        tile_count = 0
+        
+        def build_tile(node):
+            """导出叶子内容并生成 tileset 中对应的 tile"""
+            nonlocal tile_count
+            lower, upper = node["bounds"]
+            center = (lower + upper) / 2
+            half = np.maximum((upper - lower) / 2, 1e-6)
+            # glTF内容在3D Tiles中会先从Y轴向上旋转到Z轴向上，包围盒要在旋转后的坐标系中表示
+            tile = {
+                "boundingVolume": {"box": [
+                    center[0], -center[2], center[1],
+                    half[0], 0, 0,
+                    0, 0, half[1],
+                    0, -half[2], 0
+                ]},
+                "geometricError": float(np.linalg.norm(upper - lower)) if node["children"] else 0.0
+            }
+            if node["global_ids"]:
+                uri = f"tiles/{tile_count}.glb"
+                tile_count += 1
+                tile_ids = set(node["global_ids"])
+                tile_products = [product for product in products if product.GlobalId in tile_ids]
+                ifc_to_gltf(ifc_file, os.path.join(output_dir, uri), cache_dir=cache_dir, products=tile_products,
+                            relationship_index=relationship_index, **options)
+                tile["content"] = {"uri": uri}
+            if node["children"]:
+                tile["children"] = [build_tile(child) for child in node["children"]]
+            return tile
+        
+        root = build_tile(tree)
     
-    # 添加扩展信息
-    gltf.extras = {
-        "components": component_info
+    root["refine"] = "ADD"
+    # 抵消 glTF Y轴向上 -> Z轴向上 的旋转，使内容保持IFC原始坐标（Z轴向上）
+    root["transform"] = [1, 0, 0, 0, 0, 0, -1, 0, 0, 1, 0, 0, 0, 0, 0, 1]
+    tileset = {
+        "asset": {"version": "1.1", "generator": "IfcOpenShell GLTF Exporter"},
+        "geometricError": root["geometricError"] or 1.0,
+        "root": root
     }
+    tileset_path = os.path.join(output_dir, "tileset.json")
+    with open(tileset_path, "w") as f:
+        json.dump(convert_numpy_types(tileset), f, indent=2)
+    print(f"分块输出完成，共 {tile_count} 块: {tileset_path}")
+    return tileset_path
+
+def output_files(gltf_file_path):
+    """一次转换实际生成的文件（.gltf/.glb、.bin、属性数据库）"""
+    base = os.path.splitext(gltf_file_path)[0]
+    candidates = [gltf_file_path, base + ".properties.sqlite"]
+    if not gltf_file_path.lower().endswith(".glb"):
+        candidates.insert(1, base + ".bin")
+    return [path for path in candidates if os.path.exists(path)]
+
+def run_conversion_job(ifc_file_path, gltf_file_path, log_path, memory_limit, options, connection):
+    """
+    批量转换的子进程入口：限制内存、把输出重定向到日志文件，结果通过 connection 发回父进程
+    memory_limit: 地址空间上限（字节），超出时分配失败，按转换失败处理
+    """
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
     
-    # 在保存之前进行最后的类型转换
-    gltf = convert_all_numpy_in_gltf(gltf)
-    gltf.save(gltf_file_path)
-    print(f"转换完成！")
-    print(f"GLTF文件已保存为: {gltf_file_path}")
-    print(f"几何数据已保存为: {bin_file_path}")
+    result = {"status": "ok", "error": None}
+    with open(log_path, "w", encoding="utf-8") as log:
+        sys.stdout = sys.stderr = log
+        try:
+            summary = ifc_to_gltf(ifc_file_path, gltf_file_path, **options)
+            if summary is None:
+                result.update(status="failed", error="IFC文件加载失败")
+            else:
+                result.update(products=summary["products"], nodes=summary["nodes"], meshes=summary["meshes"])
+        except MemoryError:
+            result.update(status="failed", error="超出内存限制")
+        except Exception as e:
+            result.update(status="failed", error=f"{type(e).__name__}: {e}")
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    connection.send(result)
+    connection.close()
 
-if __name__ == "__main__":
-    # 转换文件
-    import time
-    ifc_file_path = "1234.ifc"
-    gltf_file_path = "1234_bin_gltf.gltf"
+def convert_batch(source, output_dir, workers=None, timeout=None, memory_limit=None, extension=".glb",
+                  manifest_path=None, **options):
+    """
+    批量转换：source 为目录（转换其中所有 .ifc 文件）或通配符模式，每个文件在独立的子进程中转换，
+    同时最多运行 workers 个（默认CPU核心数）；单个文件超时（秒）会被终止，内存超限或崩溃只影响该文件
+    extension: 输出格式，".glb" 或 ".gltf"
+    manifest_path: 任务清单路径，默认 output_dir/manifest.json，记录每个文件的状态、用时、构件数和输出大小
+    options: 传给 ifc_to_gltf 的其他参数
+    返回任务清单
+    """
+    if extension not in (".glb", ".gltf"):
+        raise ValueError(f"不支持的输出格式: {extension}")
+    if os.path.isdir(source):
+        # 只匹配一次再按扩展名筛选：Windows 上 glob 不区分大小写，分别匹配 *.ifc 和 *.IFC 会得到重复文件
+        sources = sorted(path for path in glob.glob(os.path.join(source, "*"))
+                         if os.path.splitext(path)[1].lower() == ".ifc")
+    else:
+        sources = sorted({os.path.normcase(os.path.abspath(path)): path for path in glob.glob(source)}.values())
+    if not sources:
+        raise FileNotFoundError(f"没有找到IFC文件: {source}")
+    
+    # 输出保持源文件相对于公共目录的路径（如 projects/*/model.ifc -> output_dir/<项目>/model.glb），避免同名文件互相覆盖
+    base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in sources])
+    output_names = [
+        os.path.splitext(os.path.relpath(os.path.abspath(path), base_dir))[0] for path in sources
+    ]
+    seen = {}
+    for path, name in zip(sources, output_names):
+        key = os.path.normcase(name)
+        if key in seen:
+            raise ValueError(f"输出文件名冲突: {seen[key]} 和 {path} 都会输出为 {name}{extension}")
+        seen[key] = path
+    if memory_limit and resource is None:
+        print("警告: 当前系统不支持内存限制，memory_limit 将被忽略")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = manifest_path or os.path.join(output_dir, "manifest.json")
+    workers = workers or os.cpu_count() or 1
+    
+    pending = list(enumerate(zip(sources, output_names)))
+    running = {}
+    entries = [None] * len(sources)
+    batch_start = time.time()
+    
+    def start_job(index, job_paths):
+        ifc_file_path, name = job_paths
+        gltf_file_path = os.path.join(output_dir, name + extension)
+        os.makedirs(os.path.dirname(gltf_file_path), exist_ok=True)
+        log_path = os.path.join(output_dir, name + ".log")
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=run_conversion_job,
+            args=(ifc_file_path, gltf_file_path, log_path, memory_limit, options, sender),
+            daemon=True
+        )
+        process.start()
+        sender.close()
+        running[process.sentinel] = {
+            "index": index, "process": process, "connection": receiver, "start": time.time(),
+            "entry": {"source": ifc_file_path, "output": gltf_file_path, "log": log_path}
+        }
+    
+    def finish_job(sentinel, status=None):
+        job = running.pop(sentinel)
+        process, entry = job["process"], job["entry"]
+        if status == "timeout":
+            process.terminate()
+        process.join()
+        if os.path.exists(entry["output"] + ".bin.tmp"):
+            # 被终止的GLB转换留下的临时几何文件
+            os.remove(entry["output"] + ".bin.tmp")
+        if status is None:
+            try:
+                result = job["connection"].recv()
+            except EOFError:
+                # 子进程没有发回结果就退出（被系统杀死、段错误等）
+                result = {"status": "crashed", "error": f"子进程异常退出，退出码 {process.exitcode}"}
+            entry.update(result)
+        else:
+            entry.update(status=status, error=f"超过 {timeout} 秒未完成")
+        job["connection"].close()
+        entry["seconds"] = round(time.time() - job["start"], 3)
+        entry["output_bytes"] = sum(os.path.getsize(path) for path in output_files(entry["output"]))
+        entries[job["index"]] = entry
+        print(f"[{entry['status']}] {entry['source']} ({entry['seconds']:.2f}秒)")
+    
+    while pending or running:
+        while pending and len(running) < workers:
+            start_job(*pending.pop(0))
+        
+        wait_timeout = None
+        if timeout:
+            now = time.time()
+            wait_timeout = max(0.0, min(job["start"] + timeout - now for job in running.values()))
+        for sentinel in multiprocessing.connection.wait(list(running), wait_timeout):
+            finish_job(sentinel)
+        if timeout:
+            now = time.time()
+            for sentinel in [s for s, job in running.items() if now - job["start"] >= timeout]:
+                finish_job(sentinel, "timeout")
+    
+    manifest = {
+        "source": source,
+        "seconds": round(time.time() - batch_start, 3),
+        "succeeded": sum(entry["status"] == "ok" for entry in entries),
+        "failed": sum(entry["status"] != "ok" for entry in entries),
+        "files": entries
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"批量转换完成: 成功 {manifest['succeeded']} 个，失败 {manifest['failed']} 个，清单: {manifest_path}")
+    return manifest
+
+def serve_worker(connection, file_cache_size):
+    """
+    常驻转换服务的工作进程：保持最近打开的IFC文件（LRU），逐个执行父进程发来的任务，
+    任务为 (IFC路径, 输出路径, ifc_to_gltf参数)，收到 None 时退出
+    """
+    # 已打开的IFC文件：路径 -> ((修改时间, 大小), ifcopenshell.file)
+    open_files = OrderedDict()
+    
+    def get_open_file(ifc_file_path):
+        """从LRU缓存取得已打开的IFC文件，文件被修改过时重新打开"""
+        stat = os.stat(ifc_file_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = open_files.get(ifc_file_path)
+        if entry is not None and entry[0] == stamp:
+            open_files.move_to_end(ifc_file_path)
+            return entry[1]
+        if stat.st_size == 0:
+            raise ValueError(f"IFC文件为空: {ifc_file_path}")
+        print(f"正在加载IFC文件: {ifc_file_path}")
+        ifc_file = ifcopenshell.open(ifc_file_path)
+        open_files[ifc_file_path] = (stamp, ifc_file)
+        open_files.move_to_end(ifc_file_path)
+        while len(open_files) > file_cache_size:
+            open_files.popitem(last=False)
+        return ifc_file
+    
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        ifc_file_path, gltf_file_path, options = task
+        try:
+            summary = ifc_to_gltf(get_open_file(ifc_file_path), gltf_file_path, **options)
+            result = {"status": "ok", "products": summary["products"], "nodes": summary["nodes"],
+                      "meshes": summary["meshes"]}
+        except Exception as e:
+            result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        connection.send(result)
+    connection.close()
+
+def serve(host="127.0.0.1", port=8765, workers=2, file_cache_size=4, max_jobs=1000):
+    """
+    常驻转换服务：转换在 workers 个常驻工作进程中执行，进程内保持 ifcopenshell/pygltflib 已加载，
+    最近打开的IFC文件保存在各进程的LRU缓存中，同一模型以不同参数或格式重复导出时不需要重新解析
+    HTTP接口（JSON）：
+        POST /convert  {"source": IFC路径, "output": 输出路径, "options": {...ifc_to_gltf参数}, "wait": false}
+                       返回任务信息；wait 为 true 时等待转换完成后返回
+        GET /jobs/<id> 查询任务状态：queued、running、ok、failed、crashed
+        GET /health    服务状态
+    workers: 工作进程数，即同时运行的转换任务数；每个进程一次只执行一个任务，其余任务排队
+             已打开某个IFC文件的进程优先接收该文件的任务（同一文件的任务因此串行执行），否则交给排队最少的进程
+             工作进程崩溃（如几何内核段错误）时当前任务记为 crashed，进程自动重启，不影响服务和其他任务
+    file_cache_size: 每个工作进程缓存的已打开IFC文件数量（每个进程各自占用一份模型内存）
+    max_jobs: 保留的任务记录数量，超出时丢弃最早完成的任务
+    """
+    jobs = OrderedDict()
+    jobs_lock = threading.Lock()
+    # 工作进程：每个进程配一个单线程执行器，任务在其中排队，通过管道交给进程执行
+    # files 记录该进程已打开的IFC文件（与进程内的LRU一致），用于按文件分配任务
+    slots = [
+        {"executor": ThreadPoolExecutor(max_workers=1), "process": None, "connection": None,
+         "files": OrderedDict(), "pending": 0}
+        for _ in range(workers)
+    ]
+    slots_lock = threading.Lock()
+    
+    def start_worker(slot):
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=serve_worker, args=(child_connection, file_cache_size), daemon=True)
+        process.start()
+        child_connection.close()
+        slot.update(process=process, connection=connection)
+        slot["files"].clear()
+    
+    def assign_slot(ifc_file_path):
+        """选择执行任务的工作进程：优先已打开该文件的进程，否则选排队最少的进程"""
+        with slots_lock:
+            slot = next((slot for slot in slots if ifc_file_path in slot["files"]),
+                        min(slots, key=lambda slot: slot["pending"]))
+            slot["pending"] += 1
+            slot["files"][ifc_file_path] = True
+            slot["files"].move_to_end(ifc_file_path)
+            while len(slot["files"]) > file_cache_size:
+                slot["files"].popitem(last=False)
+            return slot
+    
+    def run_job(slot, job):
+        job["status"] = "running"
+        start = time.time()
+        try:
+            slot["connection"].send((job["source"], job["output"], job["options"]))
+            job.update(slot["connection"].recv())
+        except (EOFError, OSError):
+            # 工作进程没有发回结果就退出（段错误、被系统杀死等），重启后继续处理后续任务
+            slot["process"].join()
+            job.update(status="crashed", error=f"转换进程异常退出，退出码 {slot['process'].exitcode}")
+            slot["connection"].close()
+            with slots_lock:
+                start_worker(slot)
+        finally:
+            with slots_lock:
+                slot["pending"] -= 1
+        job["seconds"] = round(time.time() - start, 3)
+    
+    def submit(request):
+        if not isinstance(request, dict):
+            raise ValueError("请求内容必须是JSON对象")
+        if "source" not in request or "output" not in request:
+            raise ValueError("缺少 source 或 output")
+        if not isinstance(request.get("options", {}), dict):
+            raise ValueError("options 必须是JSON对象")
+        if not os.path.exists(request["source"]):
+            raise FileNotFoundError(f"IFC文件不存在: {request['source']}")
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "source": request["source"],
+            "output": request["output"],
+            "options": request.get("options", {})
+        }
+        with jobs_lock:
+            jobs[job["id"]] = job
+            finished = [job_id for job_id, j in jobs.items() if j["status"] in ("ok", "failed", "crashed")]
+            for job_id in finished[:max(0, len(jobs) - max_jobs)]:
+                del jobs[job_id]
+        slot = assign_slot(os.path.abspath(job["source"]))
+        future = slot["executor"].submit(run_job, slot, job)
+        if request.get("wait"):
+            future.result()
+        return job
+    
+    # 在启动HTTP服务线程之前创建工作进程
+    for slot in slots:
+        start_worker(slot)
+    
+    class ConversionHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_POST(self):
+            if self.path != "/convert":
+                return self.send_json(404, {"error": "未知接口"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                job = submit(request)
+            except (ValueError, FileNotFoundError) as e:
+                return self.send_json(400, {"error": str(e)})
+            self.send_json(200, job)
+        
+        def do_GET(self):
+            if self.path == "/health":
+                with jobs_lock:
+                    counts = {}
+                    for job in jobs.values():
+                        counts[job["status"]] = counts.get(job["status"], 0) + 1
+                with slots_lock:
+                    open_files = sorted({path for slot in slots for path in slot["files"]})
+                return self.send_json(200, {"jobs": counts, "open_files": open_files})
+            if self.path.startswith("/jobs/"):
+                job = jobs.get(self.path[len("/jobs/"):])
+                if job is None:
+                    return self.send_json(404, {"error": "任务不存在"})
+                return self.send_json(200, job)
+            self.send_json(404, {"error": "未知接口"})
+    
+    server = ThreadingHTTPServer((host, port), ConversionHandler)
+    print(f"转换服务已启动: http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for slot in slots:
+            slot["executor"].shutdown(wait=True)
+            slot["connection"].send(None)
+            slot["process"].join()
+
+def main(argv=None):
+    """
+    命令行入口：
+        python ve_bin_gltf.py model.ifc -o model.glb           转换单个文件
+        python ve_bin_gltf.py models/ -o out/ --workers 8      批量转换目录（或通配符）中的所有IFC文件
+        python ve_bin_gltf.py --serve --port 8765              启动常驻转换服务
+    """
+    parser = argparse.ArgumentParser(description="将IFC文件转换为glTF/GLB")
+    parser.add_argument("source", nargs="?", default="1234.ifc", help="IFC文件、目录或通配符模式")
+    parser.add_argument("-o", "--output", help="输出文件（单个文件）或输出目录（批量）")
+    parser.add_argument("--workers", type=int, help="批量转换的并行进程数，默认CPU核心数")
+    parser.add_argument("--timeout", type=float, help="批量转换时单个文件的超时时间（秒）")
+    parser.add_argument("--memory-limit", type=int, help="批量转换时单个进程的内存上限（MB，仅类Unix系统）")
+    parser.add_argument("--format", choices=["glb", "gltf"], default="glb", help="批量转换的输出格式")
+    parser.add_argument("--manifest", help="批量转换任务清单路径，默认 <输出目录>/manifest.json")
+    parser.add_argument("--threads", type=int, help="单个文件三角化使用的线程数，默认全部CPU核心")
+    parser.add_argument("--include", nargs="+", metavar="IFC_CLASS", help="只导出这些IFC类型（含子类）")
+    parser.add_argument("--exclude", nargs="+", metavar="IFC_CLASS", help="不导出这些IFC类型，如 IfcSpace IfcOpeningElement")
+    parser.add_argument("--storey", nargs="+", help="只导出这些楼层（名称或GlobalId）中的构件")
+    parser.add_argument("--global-ids", nargs="+", help="只导出这些 GlobalId 对应的构件")
+    parser.add_argument("--quiet", action="store_true", help="不逐个打印构件处理结果")
+    parser.add_argument("--profile", action="store_true", help="在输出文件旁写入 .profile.json 性能报告")
+    parser.add_argument("--serve", action="store_true", help="启动常驻转换服务（HTTP）")
+    parser.add_argument("--host", default="127.0.0.1", help="转换服务监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="转换服务端口")
+    args = parser.parse_args(argv)
+    
+    if args.serve:
+        serve(args.host, args.port, workers=args.workers or 2)
+        return
+    
+    options = {
+        "include_classes": args.include,
+        "exclude_classes": args.exclude,
+        "storeys": args.storey,
+        "global_ids": args.global_ids,
+        "verbose": not args.quiet,
+        "profile": args.profile
+    }
     start_time = time.time()
-    ifc_to_gltf(ifc_file_path, gltf_file_path)
+    if os.path.isdir(args.source) or any(c in args.source for c in "*?["):
+        convert_batch(
+            args.source, args.output or "output",
+            workers=args.workers,
+            timeout=args.timeout,
+            memory_limit=args.memory_limit * 1024 ** 2 if args.memory_limit else None,
+            extension="." + args.format,
+            manifest_path=args.manifest,
+            num_threads=args.threads or 1,
+            **options
+        )
+    else:
+        gltf_file_path = args.output or os.path.splitext(args.source)[0] + "_bin_gltf.gltf"
+        ifc_to_gltf(args.source, gltf_file_path, num_threads=args.threads, **options)
     end_time = time.time()
     print(f"转换完成！用时: {end_time - start_time:.2f}秒")
 
+if __name__ == "__main__":
+    main()
+
 # import sys
 # print(sys.path)
 